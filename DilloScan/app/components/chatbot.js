@@ -12,6 +12,7 @@ export default function Chatbot({ ingredients, analysisData }) {
   const [input, setInput] = useState("");
   const [loading, setLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  const conversationIdRef = useRef(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -35,12 +36,13 @@ export default function Chatbot({ ingredients, analysisData }) {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ question: input }),
+        body: JSON.stringify({ question: input, conversation_id: conversationIdRef.current }),
       });
 
       const result = await response.json();
 
       if (result.success) {
+        conversationIdRef.current = result.conversation_id;
         const botMessage = { role: "assistant", content: result.response };
         setMessages((prev) => [...prev, botMessage]);
       } else {
@@ -1,10 +1,21 @@
 # ingredx/__init__.py
-from dotenv import load_dotenv
 import os
 
-# Load .env automatically when ingredx is imported
+# .env is loaded on demand (see load_env) rather than at import, so the CLI,
+# tests and worker processes don't pay for python-dotenv unless they need a key.
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
-load_dotenv(dotenv_path)
+_env_loaded = False
 
-if not os.getenv("OPENAI_API_KEY"):
-    print("⚠️  Warning: OPENAI_API_KEY not found in environment.")
+
+def load_env() -> None:
+    """Load .env once per process and warn if OPENAI_API_KEY is still missing."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("⚠️  Warning: OPENAI_API_KEY not found in environment.")
@@ -0,0 +1,26 @@
+# ingredx/adapters/openai_client.py
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from .. import load_env
+
+_clients: Dict[Optional[str], Any] = {}
+_lock = threading.Lock()
+
+
+def get_openai_client(api_key: str | None = None):
+    """
+    Return a process-wide OpenAI client for the given key, creating it on first use.
+    All adapters share it, so one HTTP connection pool serves summarizer and translator.
+    """
+    load_env()
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            from openai import OpenAI  # deferred: importing openai pulls in httpx/pydantic
+            client = OpenAI(api_key=key)
+            _clients[key] = client
+    return client
@@ -1,15 +1,27 @@
 from __future__ import annotations
-import os
-from openai import OpenAI
+from ..core.deadline import call_timeout
+from .openai_client import get_openai_client
 
 class OpenAISummarizer:
-    def __init__(self, api_key: str | None = None):
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    def __init__(self, api_key: str | None = None, model: str = "gpt-4o-mini", client=None, timeout: float = 30.0):
+        self.api_key = api_key
+        self.model = model
+        self._client = client
+        self.timeout = timeout  # per-request seconds; the client default would wait up to 10 minutes
+
+    @property
+    def client(self):
+        """OpenAI client, created (or borrowed from the shared pool) on first call."""
+        if self._client is None:
+            self._client = get_openai_client(self.api_key)
+        return self._client
 
     def summarize(self, prompt: str, force_json: bool = False) -> str:
         """
         Summarize text via OpenAI. If force_json=True, use structured output enforcement.
+        The request timeout shrinks to what is left of the current request deadline.
         """
+        timeout = call_timeout(self.timeout, "summarizer call")
         try:
             # If forcing JSON, ensure the prompt explicitly contains "json"
             if force_json:
@@ -17,19 +29,20 @@ class OpenAISummarizer:
                     prompt += "\n\nRespond only in valid JSON format."
 
                 completion = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
+                    model=self.model,
                     messages=[{"role": "user", "content": prompt}],
                     response_format={"type": "json_object"},  # Strict JSON
+                    timeout=timeout,
                 )
             else:
                 # Normal text response
                 completion = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
+                    model=self.model,
                     messages=[{"role": "user", "content": prompt}],
+                    timeout=timeout,
                 )
 
             return completion.choices[0].message.content.strip()
 
         except Exception as e:
             return f"[Error: {e}]"
-
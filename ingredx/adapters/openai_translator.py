@@ -1,20 +1,57 @@
 # ingredx/adapters/openai_translator.py
 from __future__ import annotations
-import os
-from openai import OpenAI
+import json
+from typing import List, Optional
+
+from ..core.deadline import call_timeout
+from ..core.langid import NgramLanguageDetector
 from ..core.translator import Translator
+from .openai_client import get_openai_client
 
 class OpenAITranslator(Translator):
     """
-    Translator using OpenAI models for language detection and translation.
+    Translator using OpenAI models for translation. Language detection runs
+    locally (character n-gram scoring); the model is only consulted for
+    low-confidence text when `llm_detection_fallback` is enabled.
     """
 
-    def __init__(self, model: str = "gpt-4o-mini", api_key: str | None = None):
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    # translate_many packs up to this many strings / characters into one request
+    BATCH_SIZE = 40
+    BATCH_CHARS = 12000
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        api_key: str | None = None,
+        client=None,
+        detector: Optional[NgramLanguageDetector] = None,
+        llm_detection_fallback: bool = False,
+        min_confidence: float = 0.05,
+        timeout: float = 30.0,
+    ):
+        self.api_key = api_key
         self.model = model
+        self._client = client
+        self.detector = detector or NgramLanguageDetector()
+        self.llm_detection_fallback = llm_detection_fallback
+        self.min_confidence = min_confidence
+        self.timeout = timeout  # per-request seconds
+
+    @property
+    def client(self):
+        """OpenAI client, created (or borrowed from the shared pool) on first call."""
+        if self._client is None:
+            self._client = get_openai_client(self.api_key)
+        return self._client
 
     def detect_language(self, text: str) -> str:
         """Return ISO language code for the input (e.g. 'en', 'es', 'fr')."""
+        code, confidence = self.detector.detect_with_confidence(text)
+        if confidence >= self.min_confidence or not self.llm_detection_fallback:
+            return code
+        return self._detect_language_llm(text)
+
+    def _detect_language_llm(self, text: str) -> str:
         resp = self.client.chat.completions.create(
             model=self.model,
             messages=[
@@ -28,6 +65,7 @@ class OpenAITranslator(Translator):
                 {"role": "user", "content": text},
             ],
             temperature=0.0,
+            timeout=call_timeout(self.timeout, "translator call"),
         )
         code = resp.choices[0].message.content.strip().lower()
         if len(code) > 2:
@@ -49,5 +87,51 @@ class OpenAITranslator(Translator):
                 {"role": "user", "content": text},
             ],
             temperature=0.0,
+            timeout=call_timeout(self.timeout, "translator call"),
         )
         return resp.choices[0].message.content.strip()
+
+    def translate_many(self, texts: List[str], target_language: str) -> List[str]:
+        """Translate many strings with one request per batch instead of one per string."""
+        results: List[str] = []
+        batch: List[str] = []
+        size = 0
+        for text in texts:
+            if batch and (len(batch) >= self.BATCH_SIZE or size + len(text) > self.BATCH_CHARS):
+                results.extend(self._translate_batch(batch, target_language))
+                batch, size = [], 0
+            batch.append(text)
+            size += len(text)
+        if batch:
+            results.extend(self._translate_batch(batch, target_language))
+        return results
+
+    def _translate_batch(self, texts: List[str], target_language: str) -> List[str]:
+        if len(texts) == 1:
+            return [self.translate(texts[0], target_language)]
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        f"You are a precise translator. Translate every string in the user's JSON array "
+                        f"into {target_language}. Respond with a JSON object {{\"translations\": [...]}} "
+                        f"holding the translations in the same order, one per input string. "
+                        f"Do NOT add commentary or explanations."
+                    ),
+                },
+                {"role": "user", "content": json.dumps(texts, ensure_ascii=False)},
+            ],
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            timeout=call_timeout(self.timeout, "translator call"),
+        )
+        try:
+            translations = json.loads(resp.choices[0].message.content)["translations"]
+            if len(translations) == len(texts) and all(isinstance(t, str) for t in translations):
+                return [t.strip() for t in translations]
+        except Exception:
+            pass
+        # Model broke the contract: fall back to one request per string
+        return [self.translate(text, target_language) for text in texts]
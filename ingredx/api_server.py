@@ -1,10 +1,13 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import atexit
 import base64
+import functools
 import io
-from PIL import Image
-import pytesseract
+import selectors
+import socket
 import sys
+import threading
 import traceback
 import os
 
@@ -22,6 +25,7 @@ try:
     print("📦 Importing IngredientEngine...")
     # Import as a package module
     from ingredx.engine import IngredientEngine
+    from ingredx.core.deadline import Deadline, DeadlineExceeded, RequestCancelled, call_timeout, check_deadline, use_deadline
     print("✅ IngredientEngine imported successfully!")
 except Exception as e:
     print(f"❌ ERROR importing IngredientEngine: {e}")
@@ -31,28 +35,153 @@ except Exception as e:
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the engine with error handling
-try:
-    print("🔧 Initializing IngredientEngine...")
-    engine = IngredientEngine()
-    print("✅ IngredientEngine initialized successfully!")
-except Exception as e:
-    print(f"❌ ERROR initializing IngredientEngine: {e}")
-    traceback.print_exc()
-    sys.exit(1)
+# The engine is built on the first request (or by __main__), not at import,
+# so spawning workers and importing this module for tests stays cheap.
+engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the shared IngredientEngine, creating it on first use."""
+    global engine
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                print("🔧 Initializing IngredientEngine...")
+                engine = IngredientEngine()
+                print("✅ IngredientEngine initialized successfully!")
+    return engine
+
+
+# Scans are kept so products can be queried by ingredient and ranked later.
+# NumPy is only imported once the store is first touched.
+scan_store = None
+_scan_store_lock = threading.Lock()
+
+
+def get_scan_store():
+    """Return the shared ScanStore, loading it from disk on first use."""
+    global scan_store
+    if scan_store is None:
+        with _scan_store_lock:
+            if scan_store is None:
+                from ingredx.scan_store import ScanStore
+                scan_store = ScanStore()
+                atexit.register(scan_store.save)
+                print(f"🗂️  Scan store loaded ({len(scan_store)} products)")
+    return scan_store
+
+
+def record_scan(results, product=None):
+    """Add an analyzed label to the scan store; a store failure never fails the analysis."""
+    try:
+        names = [results['canonical'][ing] for ing in results['ingredients']]
+        ratings = [(results['schemas'].get(ing) or {}).get('health_safety_rating') for ing in results['ingredients']]
+        return get_scan_store().add(names, ratings, product=product)
+    except Exception as e:
+        print(f"⚠️  Could not record scan: {e}")
+        return None
+
+
+# ---------- Request deadlines ----------
+# End-to-end budget per endpoint (seconds). Clients may ask for another one with
+# the X-Request-Timeout header, capped at MAX_REQUEST_TIMEOUT.
+DEADLINE_HEADER = 'X-Request-Timeout'
+ENDPOINT_DEADLINES = {
+    'analyze_image': 60.0,
+    'analyze_text': 120.0,
+    'chat': 30.0,
+    'compare': 30.0,
+}
+MAX_REQUEST_TIMEOUT = 300.0
+OCR_TIMEOUT = 30.0  # tesseract is killed after this long (or when the deadline is up)
+
+
+def _request_deadline(endpoint):
+    budget = ENDPOINT_DEADLINES[endpoint]
+    try:
+        requested = float(request.headers.get(DEADLINE_HEADER, ''))
+        if requested > 0:
+            budget = min(requested, MAX_REQUEST_TIMEOUT)
+    except ValueError:
+        pass  # absent or malformed header: endpoint default
+    return Deadline(budget)
+
+
+def _watch_disconnect(deadline, done, sock, interval=0.2):
+    """
+    Cancel the deadline when the client closes its connection before we answer.
+    Peeks at a plain-socket duplicate of the descriptor, so TLS sockets (which
+    refuse MSG_PEEK) work too; only an orderly EOF counts as a disconnect, and
+    any error just stops the watch.
+    """
+    try:
+        raw = socket.socket(fileno=os.dup(sock.fileno()))
+    except (OSError, ValueError):
+        return
+    try:
+        with raw, selectors.DefaultSelector() as selector:  # epoll/kqueue: no FD_SETSIZE limit
+            selector.register(raw, selectors.EVENT_READ)
+            while not done.wait(interval):
+                if not selector.select(timeout=0):
+                    continue
+                # readable with nothing to read means the peer hung up
+                if raw.recv(1, socket.MSG_PEEK | getattr(socket, "MSG_DONTWAIT", 0)) == b'':
+                    deadline.cancel()
+                    return
+    except (OSError, ValueError):
+        return
+
+
+def with_deadline(endpoint):
+    """Run a view under a request deadline that also trips on client disconnect."""
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            deadline = _request_deadline(endpoint)
+            done = threading.Event()
+            sock = request.environ.get('werkzeug.socket') or request.environ.get('gunicorn.socket')
+            if sock is not None:
+                threading.Thread(target=_watch_disconnect, args=(deadline, done, sock), daemon=True).start()
+            try:
+                with use_deadline(deadline):
+                    return view(*args, **kwargs)
+            finally:
+                done.set()
+        return wrapper
+    return decorate
+
+
+def deadline_response(e):
+    """504 when the budget ran out; 499 (client closed request) when the client went away."""
+    cancelled = isinstance(e, RequestCancelled)
+    print(f"🔌 {e}" if cancelled else f"⏱️  {e}")
+    return jsonify({
+        'success': False,
+        'error': str(e)
+    }), 499 if cancelled else 504
 
 
 @app.route('/', methods=['GET'])
 def home():
-    """Health check endpoint"""
-    return jsonify({
+    """Health check endpoint (with backend circuit states once the engine is up)"""
+    status = {
         'status': 'running',
         'message': 'DilloScan API is running!',
-        'endpoints': ['/api/analyze-image', '/api/chat']
-    })
+        'endpoints': ['/api/analyze-image', '/api/analyze-text', '/api/chat', '/api/chat/stats', '/api/compare',
+                      '/api/products', '/api/products/rank', '/api/products/<product>/score']
+    }
+    if engine is not None:
+        status['degraded'] = engine.degraded
+        status['backends'] = {
+            'llm': engine.llm_breaker.snapshot(),
+            'translation': engine.translation_breaker.snapshot()
+        }
+    return jsonify(status)
 
 
 @app.route('/api/analyze-image', methods=['POST'])
+@with_deadline('analyze_image')
 def analyze_image():
     """
     Accepts a base64 image, extracts text via OCR,
@@ -64,6 +193,10 @@ def analyze_image():
         
         data = request.json
         image_data = data.get('image')
+        # Output language; "auto" answers in the label's detected language
+        language = data.get('language', 'en')
+        # Optional product id (e.g. barcode); a re-scan replaces the product's earlier scan
+        product = data.get('product')
         
         if not image_data:
             return jsonify({
@@ -75,6 +208,10 @@ def analyze_image():
         if ',' in image_data:
             image_data = image_data.split(',')[1]
         
+        # OCR stack is only needed on this route; keep it off the import path
+        from PIL import Image, ImageEnhance
+        import pytesseract
+
         print("🔄 Decoding base64 image...")
         # Decode base64 to image
         image_bytes = base64.b64decode(image_data)
@@ -86,20 +223,25 @@ def analyze_image():
         # Convert to grayscale
         image = image.convert('L')
         # Increase contrast
-        from PIL import ImageEnhance
         enhancer = ImageEnhance.Contrast(image)
         image = enhancer.enhance(2.0)
         
         # Extract text using Tesseract OCR with optimized settings
         print("📝 Running OCR...")
         custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0-9,.()- '
-        raw_text = pytesseract.image_to_string(image, config=custom_config)
+        try:
+            raw_text = pytesseract.image_to_string(image, config=custom_config, timeout=call_timeout(OCR_TIMEOUT, "OCR"))
+        except RuntimeError:
+            check_deadline("OCR")  # tesseract was killed because the request ran out of time
+            raise
         print(f"📄 Extracted text ({len(raw_text)} chars):")
         print(raw_text[:200] + "..." if len(raw_text) > 200 else raw_text)
         
         # Analyze ingredients using your engine
+        check_deadline("ingredient analysis")
         print("🧪 Analyzing ingredients...")
-        results = engine.analyze_ingredient_list(raw_text, language="en")
+        results = get_engine().analyze_ingredient_list(raw_text, language=language)
+        scan = record_scan(results, product) if 'error' not in results else None
         
         # Post-process: Clean up common OCR typos in ingredient names
         if results.get('ingredients'):
@@ -144,9 +286,15 @@ def analyze_image():
             'raw_text': raw_text,
             'ingredients': results.get('ingredients', []),
             'blurbs': results.get('blurbs', {}),
-            'schemas': results.get('schemas', {})
+            'schemas': results.get('schemas', {}),
+            'language': results.get('language', language),
+            'source_language': results.get('source_language'),
+            'degraded': results.get('degraded', False),
+            'scan': scan
         })
         
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         print(f"❌ ERROR in analyze_image: {str(e)}")
         traceback.print_exc()
@@ -157,32 +305,53 @@ def analyze_image():
 
 
 @app.route('/api/chat', methods=['POST'])
+@with_deadline('chat')
 def chat():
     """
-    Handle chatbot queries about ingredients
+    Handle chatbot queries about ingredients.
+    Send back the returned conversation_id to continue a conversation;
+    a request without one starts a new conversation.
     """
     try:
         print("\n💬 Received chat request")
         data = request.json
         question = data.get('question')
+        conversation_id = data.get('conversation_id')
         
         if not question:
             return jsonify({
                 'success': False,
                 'error': 'No question provided'
             }), 400
+        if conversation_id is not None and not isinstance(conversation_id, str):
+            return jsonify({
+                'success': False,
+                'error': 'conversation_id must be a string'
+            }), 400
         
         print(f"❓ Question: {question}")
         
-        result = engine.generate(question, mode="chat", output_language="en")
+        if conversation_id is None:
+            conversation_id = get_engine().new_conversation()
+        result = get_engine().generate(
+            question, mode="chat", output_language="en", conversation_id=conversation_id
+        )
         
-        print(f"✅ Generated response")
+        if result.explanation.degraded:
+            print("⚠️  Chat backend degraded")
+        else:
+            print("✅ Served cached answer" if result.explanation.cached else "✅ Generated response")
         
         return jsonify({
             'success': True,
-            'response': result.explanation.text
+            'response': result.explanation.text,
+            'conversation_id': conversation_id,
+            'cached': result.explanation.cached,
+            'degraded': result.explanation.degraded
         })
         
+    except DeadlineExceeded as e:
+        return deadline_response(e)
     except Exception as e:
         print(f"❌ ERROR in chat: {str(e)}")
         traceback.print_exc()
@@ -192,7 +361,221 @@ def chat():
         }), 500
 
 
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """Hit rate and size of the chat answer cache"""
+    return jsonify({
+        'success': True,
+        'answer_cache': get_engine().answer_cache.snapshot()
+    })
+
+
+MAX_COMPARE = 20
+
+
+@app.route('/api/compare', methods=['POST'])
+@with_deadline('compare')
+def compare():
+    """
+    Compare N ingredients side by side (rating, edibility, key schema fields).
+    Cached ingredients are served first; misses are generated concurrently.
+    """
+    try:
+        print("\n⚖️  Received compare request")
+        data = request.json or {}
+        ingredients = data.get('ingredients')
+        language = data.get('language', 'en')
+
+        if not isinstance(ingredients, list) or len(ingredients) < 2:
+            return jsonify({
+                'success': False,
+                'error': 'Provide a list of at least two ingredients'
+            }), 400
+        if len(ingredients) > MAX_COMPARE:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_COMPARE} ingredients can be compared at once'
+            }), 400
+
+        result = get_engine().compare_ingredients([str(i) for i in ingredients], language=language)
+        timing = result['timing']
+        print(f"✅ Compared {len(result['ingredients'])} ingredients "
+              f"({timing['cached']} cached, {timing['generated']} generated, {timing['total_ms']:.0f} ms)")
+
+        return jsonify({
+            'success': True,
+            'ingredients': result['ingredients'],
+            'degraded': result['degraded'],
+            'timing': timing
+        })
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        print(f"❌ ERROR in compare: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+MAX_TEXT_LABELS = 500
+
+
+@app.route('/api/analyze-text', methods=['POST'])
+@with_deadline('analyze_text')
+def analyze_text():
+    """
+    Analyze a batch of raw label texts (e.g. a partner's product feed).
+    Ingredients are deduplicated across the whole batch so each distinct one
+    costs at most one blurb + schema generation; results come back per label.
+    """
+    try:
+        print("\n📦 Received text analysis request")
+        data = request.json or {}
+        texts = data.get('texts')
+        # Output language; "auto" answers each label in its detected language
+        language = data.get('language', 'en')
+
+        if not isinstance(texts, list) or not texts:
+            return jsonify({
+                'success': False,
+                'error': 'Provide a non-empty list of label texts'
+            }), 400
+        # Optional product ids, one per text
+        products = data.get('products') or [None] * len(texts)
+        if len(texts) > MAX_TEXT_LABELS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_TEXT_LABELS} labels can be analyzed at once'
+            }), 400
+        if not isinstance(products, list) or len(products) != len(texts):
+            return jsonify({
+                'success': False,
+                'error': 'products must be a list with one entry per text'
+            }), 400
+
+        result = get_engine().analyze_labels([str(t) for t in texts], language=language)
+        stats = result['stats']
+        print(f"✅ Analyzed {stats['labels']} labels: {stats['ingredient_mentions']} ingredients, "
+              f"{stats['unique_ingredients']} unique ({stats['cached']} cached, "
+              f"{stats['generated']} generated, {stats['total_ms']:.0f} ms)")
+
+        for label, product in zip(result['labels'], products):
+            if 'error' not in label:
+                label['scan'] = record_scan(label, product)
+
+        return jsonify({
+            'success': True,
+            'results': [{'success': 'error' not in label, **label} for label in result['labels']],
+            'stats': stats
+        })
+
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except Exception as e:
+        print(f"❌ ERROR in analyze_text: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ---------- Scan store queries ----------
+
+def _canonical_args(name):
+    """Canonical ingredient keys for a repeated query parameter."""
+    return [get_engine().canonical_name(value) for value in request.args.getlist(name) if value.strip()]
+
+
+@app.route('/api/products', methods=['GET'])
+def products_with_ingredients():
+    """
+    Products whose latest scan contains every `ingredient` and no `exclude`
+    (both repeatable), e.g. /api/products?ingredient=titanium dioxide
+    """
+    try:
+        ingredients = _canonical_args('ingredient')
+        if not ingredients:
+            return jsonify({
+                'success': False,
+                'error': 'Provide at least one ingredient parameter'
+            }), 400
+        limit = request.args.get('limit', 100, type=int)
+        result = get_scan_store().products_with(ingredients, exclude=_canonical_args('exclude'), limit=limit)
+        return jsonify({'success': True, 'ingredients': ingredients, **result})
+
+    except Exception as e:
+        print(f"❌ ERROR in products_with_ingredients: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/products/rank', methods=['GET'])
+def rank_products():
+    """
+    Rank scanned products by label score: `by` is min, weighted_mean or
+    below_threshold; `order` is worst (default) or best; `ingredient` filters.
+    """
+    try:
+        ranked = get_scan_store().rank(
+            by=request.args.get('by', 'weighted_mean'),
+            worst_first=request.args.get('order', 'worst') != 'best',
+            limit=request.args.get('limit', 20, type=int),
+            threshold=request.args.get('threshold', 0.4, type=float),
+            ingredients=_canonical_args('ingredient'),
+        )
+        return jsonify({'success': True, 'products': ranked})
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        print(f"❌ ERROR in rank_products: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/products/<path:product>/score', methods=['GET'])
+def product_score(product):
+    """Label-level safety score for one product's latest scan."""
+    try:
+        score = get_scan_store().score(product, threshold=request.args.get('threshold', 0.4, type=float))
+        if score is None:
+            return jsonify({
+                'success': False,
+                'error': f'No scan recorded for product {product!r}'
+            }), 404
+        return jsonify({'success': True, **score})
+
+    except Exception as e:
+        print(f"❌ ERROR in product_score: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 if __name__ == '__main__':
+    # Fail fast on startup errors instead of on the first request
+    try:
+        get_engine()
+    except Exception as e:
+        print(f"❌ ERROR initializing IngredientEngine: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
     print("\n" + "=" * 50)
     print("✅ All systems ready!")
     print("📍 Server running on http://localhost:5000")
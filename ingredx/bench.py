@@ -0,0 +1,376 @@
+"""
+End-to-end benchmark harness for IngredientEngine and the Flask API.
+
+Runs fully offline: the engine is driven by StubSummarizer / IdentityTranslator
+(with optional simulated latency and failure rate), label text comes from a
+seeded synthetic corpus, and the images in "Luke's Stuff/" are pushed through
+/api/analyze-image when tesseract is installed.
+
+Usage:
+    python -m ingredx.bench --labels 50 --latency 0.01 --failure-rate 0.02 --out bench_results.json
+
+Each scenario reports throughput, p50/p95/p99 latency, LLM calls per item and
+peak resident-memory growth, plus prompt token, schema repair/re-ask and chat answer
+cache accounting for the whole run; the report is written as JSON so runs can
+be diffed across changes.
+"""
+from __future__ import annotations
+import argparse
+import base64
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .bench_memory import rss_kb
+from .engine import IngredientEngine
+from .core.cache import MemoryCache
+from .core.summarizer import StubSummarizer
+from .core.translator import IdentityTranslator
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_IMAGE_DIR = REPO_ROOT / "Luke's Stuff"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".avif"}
+
+# Scenario outcome for an answer served only from a fallback (cache / KB / canned text)
+DEGRADED = "degraded"
+
+# ---------------------------------------------------------------------
+# SYNTHETIC LABEL CORPUS
+# ---------------------------------------------------------------------
+
+VOCABULARY = [
+    "Water", "Sugar", "Salt", "Wheat Flour", "Corn Syrup", "High Fructose Corn Syrup",
+    "Soybean Oil", "Palm Oil", "Canola Oil", "Sunflower Lecithin", "Soy Lecithin",
+    "Citric Acid", "Ascorbic Acid", "Sodium Benzoate", "Potassium Sorbate",
+    "Calcium Propionate", "Natural Flavors", "Artificial Flavors", "Caramel Color",
+    "Red 40", "Yellow 5", "Blue 1", "Titanium Dioxide", "Xanthan Gum", "Guar Gum",
+    "Carrageenan", "Modified Corn Starch", "Maltodextrin", "Dextrose", "Aspartame",
+    "Sucralose", "Acesulfame Potassium", "Stevia Leaf Extract", "Monosodium Glutamate",
+    "Disodium Inosinate", "Yeast Extract", "Whey Protein", "Skim Milk", "Butter",
+    "Egg Yolks", "Cocoa Processed With Alkali", "Vanilla Extract", "Baking Soda",
+    "Sodium Nitrite", "Bht", "Tbhq", "Edta", "Tomato Paste", "Garlic Powder",
+    "Onion Powder", "Paprika", "Turmeric", "Niacin", "Reduced Iron",
+    "Thiamin Mononitrate", "Riboflavin", "Folic Acid", "Vitamin D3", "Zinc Oxide",
+]
+
+TEMPLATES = [
+    "INGREDIENTS: {items}. CONTAINS: {allergen}.",
+    "Nutrition Facts Serving Size 1 cup Ingredients:{items} Distributed by Acme Foods",
+    "Ingredients - {items}. May contain traces of {allergen}.",
+    "{items}",
+]
+
+ALLERGENS = ["MILK", "SOY", "WHEAT", "EGG", "TREE NUTS"]
+
+
+def synthetic_labels(count: int, seed: int = 0) -> List[str]:
+    """Build a deterministic corpus of messy, OCR-like label texts."""
+    rng = random.Random(seed)
+    labels = []
+    for _ in range(count):
+        picked = rng.sample(VOCABULARY, rng.randint(4, 14))
+        sep = rng.choice([", ", ",", "; ", ". "])
+        labels.append(
+            rng.choice(TEMPLATES).format(items=sep.join(picked), allergen=rng.choice(ALLERGENS))
+        )
+    return labels
+
+
+def sample_images() -> List[Path]:
+    """Label photos shipped with the repo."""
+    if not SAMPLE_IMAGE_DIR.is_dir():
+        return []
+    return sorted(p for p in SAMPLE_IMAGE_DIR.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+CHAT_QUESTIONS = [
+    "Is aspartame safe?",
+    "What is titanium dioxide used for?",
+    "Why is sodium benzoate in soda?",
+    "Is high fructose corn syrup worse than sugar?",
+    "What does carrageenan do?",
+    # paraphrases the answer cache should serve without an LLM call (each asked in a fresh conversation)
+    "Is aspartame bad for you?",
+    "What's titanium dioxide used for?",
+    "What does carrageenan do in food?",
+]
+
+# ---------------------------------------------------------------------
+# MEASUREMENT
+# ---------------------------------------------------------------------
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0–100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+class _RssSampler:
+    """Polls resident memory on a background thread; peak growth over the start, in KB."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_kb = self.peak_kb = rss_kb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, rss_kb())
+
+    def __enter__(self) -> "_RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, rss_kb())
+
+    @property
+    def growth_kb(self) -> int:
+        return self.peak_kb - self.start_kb
+
+
+def run_scenario(
+    items: List[Any],
+    fn: Callable[[Any], Union[bool, str]],
+    summarizer: StubSummarizer,
+) -> Dict[str, Any]:
+    """
+    Call fn on each item; fn returns False (or raises) to record an error, and
+    DEGRADED when the answer only came from a fallback (open circuit).
+    """
+    latencies: List[float] = []
+    errors = 0
+    degraded = 0
+    calls_before = summarizer.calls
+
+    # RSS sampling instead of tracemalloc, which would slow the timed loop several-fold
+    with _RssSampler() as memory:
+        started = time.perf_counter()
+        for item in items:
+            t0 = time.perf_counter()
+            try:
+                ok = fn(item)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            if ok == DEGRADED:
+                degraded += 1
+            elif not ok:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+    llm_calls = summarizer.calls - calls_before
+    return {
+        "items": len(items),
+        "errors": errors,
+        "degraded": degraded,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(items) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "llm_calls": llm_calls,
+        "llm_calls_per_item": round(llm_calls / len(items), 3) if items else 0.0,
+        "peak_rss_growth_kb": memory.growth_kb,
+    }
+
+
+# ---------------------------------------------------------------------
+# ENGINE / API WIRING
+# ---------------------------------------------------------------------
+
+
+def build_engine(summarizer: StubSummarizer, translator: IdentityTranslator) -> IngredientEngine:
+    return IngredientEngine(summarizer=summarizer, translator=translator, cache=MemoryCache())
+
+
+def load_api(engine: IngredientEngine):
+    """Import api_server and point it at the benchmark engine and an in-memory scan store."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from . import api_server
+    from .scan_store import ScanStore
+    api_server.engine = engine
+    api_server.scan_store = ScanStore(path=None)
+    return api_server
+
+
+def _tesseract_available() -> bool:
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+# ---------------------------------------------------------------------
+# SUITE
+# ---------------------------------------------------------------------
+
+
+def run_suite(
+    labels: int = 50,
+    latency: float = 0.0,
+    translator_latency: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+    include_api: bool = True,
+) -> Dict[str, Any]:
+    summarizer = StubSummarizer(latency=latency, failure_rate=failure_rate, seed=seed)
+    translator = IdentityTranslator(latency=translator_latency)
+    corpus = synthetic_labels(labels, seed=seed)
+    scenarios: Dict[str, Any] = {}
+
+    engine = build_engine(summarizer, translator)
+
+    def analyze(text: str) -> Union[bool, str]:
+        result = engine.analyze_ingredient_list(text, language="en")
+        blurbs = result.get("blurbs", {}).values()
+        if "error" in result or any(b.startswith("[Error") for b in blurbs):
+            return False
+        return DEGRADED if result.get("degraded") else True
+
+    # Cold pass fills the schema cache, warm pass re-runs the same labels
+    scenarios["engine_labels_cold"] = run_scenario(corpus, analyze, summarizer)
+    scenarios["engine_labels_warm"] = run_scenario(corpus, analyze, summarizer)
+
+    # Same corpus on a cold engine, 25 labels per call with ingredients deduped per batch
+    batch_engine = build_engine(summarizer, translator)
+    batches = [corpus[i:i + 25] for i in range(0, len(corpus), 25)]
+
+    def analyze_batch(texts: List[str]) -> Union[bool, str]:
+        results = batch_engine.analyze_labels(texts, language="en")["labels"]
+        if any("error" in r or any(b.startswith("[Error") for b in r["blurbs"].values()) for r in results):
+            return False
+        return DEGRADED if any(r["degraded"] for r in results) else True
+
+    scenarios["engine_batch_cold"] = run_scenario(batches, analyze_batch, summarizer)
+
+    if include_api:
+        api = load_api(engine)
+        client = api.app.test_client()
+
+        def post(path: str, payload: Dict[str, Any]) -> Union[bool, str]:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                resp = client.post(path, json=payload)
+            body = resp.get_json() or {}
+            if resp.status_code != 200 or not body.get("success"):
+                return False
+            return DEGRADED if body.get("degraded") else True
+
+        rng = random.Random(seed)
+        groups = [rng.sample(VOCABULARY, 5) for _ in range(10)]
+        scenarios["api_compare"] = run_scenario(
+            groups, lambda names: post("/api/compare", {"ingredients": names}), summarizer
+        )
+
+        # no conversation_id: each question opens its own conversation
+        scenarios["api_chat"] = run_scenario(
+            CHAT_QUESTIONS, lambda q: post("/api/chat", {"question": q}), summarizer
+        )
+
+        images = sample_images()
+        if images and _tesseract_available():
+            payloads = [
+                "data:image/jpeg;base64," + base64.b64encode(p.read_bytes()).decode("ascii")
+                for p in images
+            ]
+            scenarios["api_analyze_image"] = run_scenario(
+                payloads, lambda img: post("/api/analyze-image", {"image": img}), summarizer
+            )
+        else:
+            scenarios["api_analyze_image"] = {"skipped": "tesseract or sample images unavailable"}
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "labels": labels,
+                "latency_s": latency,
+                "translator_latency_s": translator_latency,
+                "failure_rate": failure_rate,
+                "seed": seed,
+            },
+        },
+        "scenarios": scenarios,
+        "prompts": engine.prompt_stats.snapshot(),
+        "schema": engine.schema_stats.snapshot(),
+        "answers": engine.answer_cache.snapshot() if include_api else None,
+        "breakers": {
+            "llm": engine.llm_breaker.snapshot(),
+            "translation": engine.translation_breaker.snapshot(),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ingredx end-to-end benchmark (offline, stub LLM)")
+    parser.add_argument("--labels", type=int, default=50, help="Number of synthetic labels.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency per call (s).")
+    parser.add_argument("--translator-latency", type=float, default=0.0, help="Simulated translator latency (s).")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of LLM calls that fail.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-api", action="store_true", help="Skip the Flask endpoint scenarios.")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write the JSON report.")
+    args = parser.parse_args(argv)
+
+    report = run_suite(
+        labels=args.labels,
+        latency=args.latency,
+        translator_latency=args.translator_latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+        include_api=not args.no_api,
+    )
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in report["scenarios"].items():
+        if "skipped" in stats:
+            print(f"{name:<22} skipped ({stats['skipped']})")
+            continue
+        lat = stats["latency_ms"]
+        print(
+            f"{name:<22} {stats['throughput_per_s']:>9.2f}/s  "
+            f"p50={lat['p50']:.2f}ms p95={lat['p95']:.2f}ms p99={lat['p99']:.2f}ms  "
+            f"llm/item={stats['llm_calls_per_item']:.2f}  rss+={stats['peak_rss_growth_kb']:.0f}KB  "
+            f"errors={stats['errors']} degraded={stats['degraded']}"
+        )
+    prompts = report["prompts"]
+    print(
+        f"prompts: {prompts['calls']} calls, avg {prompts['avg_prompt_tokens']} tokens, "
+        f"{prompts['prefix_cache_eligible_share']:.0%} of prompt tokens in a reused prefix"
+    )
+    answers = report["answers"]
+    if answers:
+        print(f"chat answers: {answers['hits']}/{answers['lookups']} served from the answer cache")
+    llm = report["breakers"]["llm"]
+    if llm["trips"]:
+        print(f"llm circuit: opened {llm['trips']}x, {llm['rejected']} calls failed fast (now {llm['state']})")
+    print(f"📄 Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
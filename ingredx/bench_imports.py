@@ -0,0 +1,104 @@
+"""
+Import-time budget checks for ingredx entry points.
+
+Each target is imported in a fresh interpreter under `python -X importtime`;
+the best-of-N cumulative time is compared with a budget and the set of loaded
+modules is checked against heavy dependencies that must stay off that path.
+
+Usage:
+    python -m ingredx.bench_imports --repeat 5 --scale 2.0 --out bench_imports.json
+
+Exits non-zero when any target is over budget or imports a forbidden module.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ["openai", "PIL", "pytesseract", "pydantic", "dotenv", "numpy"]
+
+# target module -> (budget in ms, top-level packages it must not import)
+BUDGETS: Dict[str, Tuple[float, List[str]]] = {
+    "ingredx": (15.0, HEAVY),
+    "ingredx.engine": (60.0, HEAVY),
+    "ingredx.cli": (150.0, HEAVY),
+    "ingredx.api_server": (300.0, HEAVY),
+}
+
+
+def measure(target: str) -> Tuple[float, Set[str]]:
+    """Import `target` in a clean interpreter; return (cumulative ms, loaded top-level packages)."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative_us = 0
+    loaded: Set[str] = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue  # header row
+        loaded.add(name.split(".")[0])
+        if name == target:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000.0, loaded
+
+
+def run_checks(repeat: int = 5, scale: float = 1.0) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for target, (budget_ms, forbidden) in BUDGETS.items():
+        timings = []
+        loaded: Set[str] = set()
+        for _ in range(repeat):
+            ms, loaded = measure(target)
+            timings.append(ms)
+        best = min(timings)
+        leaked = sorted(set(forbidden) & loaded)
+        results[target] = {
+            "best_ms": round(best, 2),
+            "median_ms": round(sorted(timings)[len(timings) // 2], 2),
+            "budget_ms": budget_ms * scale,
+            "forbidden_imports": leaked,
+            "ok": best <= budget_ms * scale and not leaked,
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ingredx import-time budget checks")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target (best is used).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all budgets (slow CI machines).")
+    parser.add_argument("--out", default=None, help="Optional JSON report path.")
+    args = parser.parse_args(argv)
+
+    results = run_checks(repeat=args.repeat, scale=args.scale)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    for target, r in results.items():
+        status = "✅" if r["ok"] else "❌"
+        extra = f"  forbidden: {', '.join(r['forbidden_imports'])}" if r["forbidden_imports"] else ""
+        print(f"{status} {target:<20} {r['best_ms']:>8.1f}ms / {r['budget_ms']:.0f}ms budget{extra}")
+        failed = failed or not r["ok"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
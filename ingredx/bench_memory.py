@@ -0,0 +1,290 @@
+"""
+Resident-memory benchmark for the rating cache representations.
+
+Each (size, representation) pair is built in a fresh interpreter from a seeded
+synthetic corpus of schema-shaped entries (prose fields, rating, edibility,
+blurb); the RSS growth after building is what one worker process would pay
+to hold that cache. Representations:
+
+    dict          plain {name: entry} dict, as the JSON backend used to hold it
+    compact       CompactTable, text stored uncompressed
+    compact-zlib  CompactTable with zlib (preset dictionary) text compression
+    compact-zstd  CompactTable with zstd, when the zstandard package is installed
+
+For sizes up to --io-max the same table is also written through the JSON file
+backend, reporting what each representation pays on disk I/O:
+
+    save_s        full snapshot rewrite (what every write cost before the journal)
+    load_s        cold JsonFileCache.load() of the snapshot, in a fresh process
+                  (a worker starting up, or another worker replaced the file)
+    load_rss_mb   that process's resident growth once loaded, and load_peak_mb
+                  its peak during the load: what a worker really pays at startup
+    put_ms        one single-entry write (journal append + replay)
+    reload_ms     picking up one entry another worker just wrote
+
+Usage:
+    python -m ingredx.bench_memory --sizes 10000 100000 1000000 --out bench_memory.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import random
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .bench_imports import REPO_ROOT
+
+REPRESENTATIONS = {
+    "dict": None,
+    "compact": {"compression": None},
+    "compact-zlib": {"compression": "zlib"},
+    "compact-zstd": {"compression": "zstd"},
+}
+
+_WHAT = ["white crystalline powder", "colorless liquid", "fine yellow powder", "viscous syrup", "waxy solid"]
+_DOES = ["preservative", "emulsifier", "thickener", "sweetener", "acidity regulator", "antioxidant", "colorant"]
+_WHERE = ["baked goods", "soft drinks", "sauces and dressings", "confectionery", "dairy products", "cosmetics"]
+_CONCERN = [
+    "Some studies have linked very high doses to digestive discomfort.",
+    "It has been debated in the context of hyperactivity in children.",
+    "Allergic reactions are rare but have been reported.",
+    "Long-term studies have not found consistent adverse effects at typical intakes.",
+]
+_REG = ["approved by the FDA and EFSA", "generally recognized as safe (GRAS)", "restricted in some EU countries"]
+
+
+def synthetic_entries(count: int, seed: int = 0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Schema-shaped cache entries with ~1 KB of prose each, generated lazily."""
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"ingredient {i:07d}"
+        what, does, where = rng.choice(_WHAT), rng.choice(_DOES), rng.choice(_WHERE)
+        yield name, {
+            "common_synonyms": f"E{100 + i % 900}, {name.title()} salt, {rng.choice(_DOES)} {i % 97}",
+            "chemical_properties": (
+                f"{name.capitalize()} is a {what} with a molar mass of {rng.uniform(40, 600):.2f} g/mol. "
+                f"It is {rng.choice(['soluble', 'sparingly soluble', 'insoluble'])} in water and stable "
+                f"up to {rng.randint(80, 300)} °C."
+            ),
+            "common_uses": f"Used as a {does} in {where} and {rng.choice(_WHERE)} at {rng.uniform(0.01, 2):.2f}% levels.",
+            "safety_and_controversy": f"{rng.choice(_CONCERN)} {rng.choice(_CONCERN)}",
+            "environmental_and_regulation": (
+                f"{name.capitalize()} is {rng.choice(_REG)}; ADI {rng.randint(1, 40)} mg/kg body weight. "
+                f"{rng.choice(['Readily biodegradable.', 'Persistent in water systems.', 'Low ecological impact.'])}"
+            ),
+            "health_safety_rating": round(rng.random(), 2),
+            "edible": rng.random() > 0.1,
+            "_blurb": f"{name.capitalize()} is a {what} used as a {does} in {where}. {rng.choice(_CONCERN)}",
+        }
+
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # peak, not current, off Linux
+
+
+def peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _cache_kwargs(representation: str) -> Dict[str, Any]:
+    options = REPRESENTATIONS[representation]
+    return {"compact": False} if options is None else {"compact": True, "compression": options["compression"]}
+
+
+def _load_child(representation: str, path: str) -> Dict[str, Any]:
+    """Load a snapshot the way a starting worker does and report its time and resident cost."""
+    from .core.cache import JsonFileCache
+
+    cache = JsonFileCache(path, **_cache_kwargs(representation))
+    gc.collect()
+    before = rss_kb()
+    started = time.perf_counter()
+    data = cache.load()
+    load_s = time.perf_counter() - started
+    gc.collect()
+    return {
+        "entries": len(data),
+        "load_s": round(load_s, 2),
+        "load_rss_mb": round((rss_kb() - before) / 1024, 1),
+        "load_peak_mb": round((peak_rss_kb() - before) / 1024, 1),
+    }
+
+
+def _file_io(table: Any, representation: str, writes: int = 50) -> Dict[str, Any]:
+    """Timings of the JSON file backend holding `table` in the given representation."""
+    from .core.cache import JsonFileCache
+
+    kwargs = _cache_kwargs(representation)
+    tmp = tempfile.mkdtemp(prefix="ingredx-bench-")
+    try:
+        path = os.path.join(tmp, "cache.json")
+        started = time.perf_counter()
+        JsonFileCache(path, **kwargs).save(table)
+        save_s = time.perf_counter() - started
+
+        proc = subprocess.run(
+            [sys.executable, "-m", "ingredx.bench_memory", "--load", representation, path],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        loaded = json.loads(proc.stdout)
+
+        worker, other = JsonFileCache(path, **kwargs), JsonFileCache(path, **kwargs)
+        worker.load()
+        other.load()
+
+        entries = list(synthetic_entries(writes, seed=1))
+        started = time.perf_counter()
+        for name, entry in entries:
+            worker.put(f"new {name}", entry)
+        put_ms = (time.perf_counter() - started) / writes * 1000
+
+        reloads = []
+        for name, entry in entries[:10]:
+            worker.put(f"foreign {name}", entry)
+            started = time.perf_counter()
+            other.load()
+            reloads.append(time.perf_counter() - started)
+        return {
+            "save_s": round(save_s, 2),
+            "load_s": loaded["load_s"],
+            "load_rss_mb": loaded["load_rss_mb"],
+            "load_peak_mb": loaded["load_peak_mb"],
+            "put_ms": round(put_ms, 3),
+            "reload_ms": round(sum(reloads) / len(reloads) * 1000, 3),
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _child(representation: str, size: int, seed: int, io: bool = False) -> Dict[str, Any]:
+    """Build one cache in this process and report its resident cost."""
+    options = REPRESENTATIONS[representation]
+    if options is None:
+        table: Any = {}
+    else:
+        from .core.compact import CompactTable
+        table = CompactTable(**options)
+        if options["compression"] and table.compression != options["compression"]:
+            return {"skipped": f"{options['compression']} not installed"}
+
+    gc.collect()
+    before = rss_kb()
+    started = time.perf_counter()
+    for name, entry in synthetic_entries(size, seed):
+        table[name] = entry
+    build_s = time.perf_counter() - started
+    gc.collect()
+    grown = rss_kb() - before
+
+    rng = random.Random(seed)
+    names = [f"ingredient {rng.randrange(size):07d}" for _ in range(min(size, 2000))]
+    started = time.perf_counter()
+    for name in names:
+        table[name]["safety_and_controversy"]
+    read_us = (time.perf_counter() - started) / len(names) * 1e6
+
+    result = {
+        "rss_mb": round(grown / 1024, 1),
+        "bytes_per_entry": round(grown * 1024 / size, 1),
+        "build_s": round(build_s, 2),
+        "read_us": round(read_us, 2),
+    }
+    if io:
+        result["file"] = _file_io(table, representation)
+    return result
+
+
+def measure(representation: str, size: int, seed: int = 0, io: bool = False) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-m", "ingredx.bench_memory", "--child", representation, str(size), str(seed), str(int(io))],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return {"skipped": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout)
+
+
+def run_suite(sizes: List[int], representations: List[str], seed: int = 0, io_max: int = 100_000) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        row = {rep: measure(rep, size, seed, io=size <= io_max) for rep in representations}
+        baseline = row.get("dict", {}).get("rss_mb")
+        for rep, stats in row.items():
+            if baseline and "rss_mb" in stats and stats["rss_mb"] > 0:
+                stats["reduction"] = round(baseline / stats["rss_mb"], 2)
+        results[str(size)] = row
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        representation, size, seed, io = argv[1], int(argv[2]), int(argv[3]), argv[4:5] == ["1"]
+        print(json.dumps(_child(representation, size, seed, io)))
+        return 0
+    if argv[:1] == ["--load"]:
+        print(json.dumps(_load_child(argv[1], argv[2])))
+        return 0
+
+    parser = argparse.ArgumentParser(description="ingredx rating-cache memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--representations", nargs="+", default=list(REPRESENTATIONS), choices=list(REPRESENTATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--io-max", type=int, default=100_000, help="Largest size to also time file I/O for.")
+    parser.add_argument("--out", default=None, help="Optional JSON report path.")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.representations, args.seed, args.io_max)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for size, row in results.items():
+        for rep, stats in row.items():
+            if "skipped" in stats:
+                print(f"{int(size):>9,} {rep:<13} skipped ({stats['skipped']})")
+                continue
+            reduction = f"  {stats['reduction']:.1f}x smaller" if rep != "dict" and "reduction" in stats else ""
+            print(
+                f"{int(size):>9,} {rep:<13} {stats['rss_mb']:>9.1f} MB  {stats['bytes_per_entry']:>7.0f} B/entry  "
+                f"build {stats['build_s']:.1f}s  read {stats['read_us']:.1f}µs{reduction}"
+            )
+            if "file" in stats:
+                io = stats["file"]
+                print(
+                    f"{'':>9} {'':<13} file: save {io['save_s']:.2f}s  load {io['load_s']:.2f}s "
+                    f"(+{io['load_rss_mb']:.0f} MB, peak +{io['load_peak_mb']:.0f} MB)  "
+                    f"put {io['put_ms']:.2f}ms  foreign reload {io['reload_ms']:.2f}ms"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
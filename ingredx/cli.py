@@ -1,15 +1,14 @@
 from __future__ import annotations
 import json
 from pathlib import Path
+from typing import List
 import typer
 from rich import print
 
-from .core.models import KnowledgeBaseConfig
-from .knowledge_base import KnowledgeBase
-from .matcher import Matcher
 from ingredx.engine import IngredientEngine
 
 # Adapters
+from ingredx.core.cache import MemoryCache
 from ingredx.core.summarizer import StubSummarizer
 from ingredx.core.translator import IdentityTranslator
 
@@ -19,19 +18,29 @@ app = typer.Typer(add_completion=False, help="ingredx: AI ingredient explanation
 
 def _load_engine(kb_path: Path, use_openai: bool = False) -> IngredientEngine:
     """Initialize IngredientEngine with either stub or OpenAI adapters."""
+    # KB + matcher pull in pydantic; import here so `--help` stays instant
+    from .core.models import KnowledgeBaseConfig
+    from .knowledge_base import KnowledgeBase
+    from .matcher import Matcher
+
     kb = KnowledgeBase(KnowledgeBaseConfig(json_path=str(kb_path)))
     matcher = Matcher(kb)
 
     if use_openai:
         from ingredx.adapters.openai_summarizer import OpenAISummarizer
         from ingredx.adapters.openai_translator import OpenAITranslator
-        summarizer = OpenAISummarizer()
-        translator = OpenAITranslator()
-    else:
-        summarizer = StubSummarizer()
-        translator = IdentityTranslator()
+        return IngredientEngine(kb=kb, matcher=matcher, summarizer=OpenAISummarizer(), translator=OpenAITranslator())
 
-    return IngredientEngine(kb=kb, matcher=matcher, summarizer=summarizer, translator=translator)
+    # Stub output is placeholder text and fake ratings: keep it out of the shared
+    # on-disk cache the API server reads from
+    return IngredientEngine(
+        kb=kb,
+        matcher=matcher,
+        summarizer=StubSummarizer(),
+        translator=IdentityTranslator(),
+        cache=MemoryCache(),
+        translation_cache=MemoryCache(),
+    )
 
 
 def _print_json(obj) -> None:
@@ -76,34 +85,52 @@ def explain(
 
 @app.command()
 def compare(
-    ingredient1: str = typer.Argument(..., help="First ingredient name."),
-    ingredient2: str = typer.Argument(..., help="Second ingredient name."),
+    ingredients: List[str] = typer.Argument(..., help="Two or more ingredient names."),
     kb: Path = typer.Option("sample_data/ingredients.json", help="Path to KB JSON."),
     lang: str = typer.Option("en", help="Output language code (ISO 639-1)."),
     openai: bool = typer.Option(False, help="Use OpenAI for summarization/translation."),
+    workers: int = typer.Option(8, help="Concurrent lookups for uncached ingredients."),
+    blurbs: bool = typer.Option(True, help="Print each ingredient's blurb under the table."),
 ):
     """
-    Compare two ingredients quickly — outputs both blurbs and key schema values.
+    Compare any number of ingredients side by side — rating, edibility and key schema fields.
+    Cached ingredients are answered instantly; the rest are generated concurrently.
     """
-    engine = _load_engine(kb, use_openai=openai)
+    from rich.table import Table
 
-    print("\n🔬 Comparing ingredients...\n")
+    if len(ingredients) < 2:
+        raise typer.BadParameter("Give at least two ingredients to compare.")
 
-    for ing in [ingredient1, ingredient2]:
-        blurb = engine.generate(ing, mode="blurb", output_language=lang)
-        schema = engine.generate(ing, mode="schema", output_language=lang)
+    engine = _load_engine(kb, use_openai=openai)
 
-        print(f"✨ {ing.title()} ✨")
-        print(blurb.explanation.text)
-        try:
-            parsed = json.loads(schema.explanation.text)
-            rating = parsed.get("health_safety_rating", "N/A")
-            edible = parsed.get("edible", "N/A")
-            print(f"→ Health Safety Rating: {rating}")
-            print(f"→ Edible: {edible}")
-        except Exception:
-            print("(Could not parse JSON schema.)")
-        print()
+    print("\n🔬 Comparing ingredients...\n")
+    result = engine.compare_ingredients(ingredients, language=lang, max_workers=workers)
+    rows = result["ingredients"]
+
+    table = Table(show_lines=True)
+    table.add_column("")
+    for row in rows:
+        table.add_column(f"✨ {row['ingredient'].title()}")
+    for field, label in [
+        ("health_safety_rating", "Health Safety Rating"),
+        ("edible", "Edible"),
+        ("common_uses", "Common Uses"),
+        ("safety_and_controversy", "Safety"),
+        ("source", "Source"),
+    ]:
+        table.add_row(label, *[str(row.get(field, "N/A")) if "error" not in row else "(error)" for row in rows])
+    print(table)
+
+    if blurbs:
+        for row in rows:
+            print(f"\n✨ {row['ingredient'].title()} ✨")
+            print(row.get("blurb") or f"(Could not analyze: {row.get('error')})")
+
+    timing = result["timing"]
+    print(
+        f"\n⏱️  {timing['total_ms']:.0f} ms total — {timing['cached']} cached in {timing['cached_ms']:.0f} ms, "
+        f"{timing['generated']} generated in {timing['generated_ms']:.0f} ms\n"
+    )
 
 
 if __name__ == "__main__":
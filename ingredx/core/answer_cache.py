@@ -0,0 +1,183 @@
+# ingredx/core/answer_cache.py
+from __future__ import annotations
+import math
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Words that refer back to earlier turns; scaffolding, not what a question is about
+REFERENCE_WORDS = {
+    "it", "its", "it's", "this", "that", "these", "those", "they", "them", "their",
+    "one", "ones", "same", "above", "previous", "earlier", "also", "else", "more", "instead",
+}
+
+# What a question asks about an ingredient; paraphrases must ask the same thing
+INTENTS = {
+    "safety": {
+        "safe", "safety", "unsafe", "bad", "good", "ok", "okay", "healthy", "unhealthy", "health",
+        "harmful", "dangerous", "risky", "risk", "risks", "toxic", "worry", "concern", "concerns",
+        "problem", "problems", "worse", "better", "avoid",
+    },
+    "uses": {"use", "used", "uses", "using", "purpose", "function", "added", "add", "put"},
+    "origin": {"made", "make", "from", "natural", "synthetic", "source", "comes"},
+}
+
+# Question scaffolding plus intent words. Everything else is a topic word, and a
+# cached answer is only reused when topic words and intents both match exactly
+# ("is aspartame safe?" ~ "is aspartame bad for you", but not "is sucralose safe?"
+# or "what is aspartame used for?").
+STOPWORDS = REFERENCE_WORDS | set().union(*INTENTS.values()) | {
+    "a", "an", "the", "is", "are", "was", "be", "being", "am", "do", "does", "did", "can", "could",
+    "should", "would", "will", "may", "might", "must", "i", "me", "my", "we", "our", "you", "your",
+    "what", "whats", "what's", "which", "who", "why", "how", "when", "where", "there", "here",
+    "of", "in", "on", "for", "to", "with", "without", "by", "at", "as", "about", "into",
+    "and", "or", "but", "if", "so", "than", "then", "not", "no", "yes", "any", "some", "all",
+    "much", "many", "really", "actually", "exactly", "tell", "explain", "know", "please", "eat",
+    "eating", "body", "people", "food", "foods", "thing", "stuff", "point", "mean", "means",
+}
+
+_WORD = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _stem(word: str) -> str:
+    # crude plural folding is enough for question matching
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def question_signature(question: str) -> Tuple[frozenset, frozenset]:
+    """(topic words, intents) of a question; reuse requires both to match."""
+    words = _words(question)
+    topics = frozenset(_stem(w) for w in words if w not in STOPWORDS)
+    intents = frozenset(name for name, vocab in INTENTS.items() if any(w in vocab for w in words))
+    return topics, intents
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    question: str
+    similarity: float
+
+
+class AnswerCache:
+    """
+    Reuses chat answers for paraphrased questions.
+
+    Questions become hashed TF-IDF vectors (word unigrams + in-word character
+    trigrams folded into `dims` buckets) held as rows of one NumPy matrix; a
+    lookup is a cosine top-k over all rows, with IDF learned from the cached
+    questions themselves. A candidate is reused only at or above `threshold`
+    similarity, in the same language, and with the same topic words and intents.
+    Least-recently-used entries are evicted beyond `capacity`.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.75,
+        capacity: int = 512,
+        dims: int = 2048,
+        top_k: int = 5,
+        stopword_weight: float = 0.2,
+    ):
+        self.threshold = threshold
+        self.stopword_weight = stopword_weight
+        self.capacity = capacity
+        self.dims = dims
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._tf = np.zeros((capacity, dims), dtype=np.float32)  # sublinear term frequencies per slot
+        self._tf2 = np.zeros((capacity, dims), dtype=np.float32)  # squared, for the weighted norms
+        self._df = np.zeros(dims, dtype=np.float32)  # how many cached questions use each bucket
+        self._slots: "OrderedDict[int, Tuple[str, str, Tuple[frozenset, frozenset], str]]" = OrderedDict()  # LRU order
+        self._free = list(range(capacity - 1, -1, -1))
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    # ---------- Vectors ----------
+    def _features(self, question: str) -> np.ndarray:
+        counts: Dict[int, float] = {}
+        for word in _words(question):
+            # scaffolding words still count, just far less than what the question is about
+            weight = self.stopword_weight if word in STOPWORDS else 1.0
+            grams = [f"w:{_stem(word)}"]
+            padded = f" {word} "
+            grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+            for gram in grams:
+                bucket = zlib.crc32(gram.encode("utf-8")) % self.dims
+                counts[bucket] = counts.get(bucket, 0.0) + weight
+        tf = np.zeros(self.dims, dtype=np.float32)
+        for bucket, count in counts.items():
+            tf[bucket] = 1.0 + math.log(count) if count >= 1 else count
+        return tf
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + len(self._slots)) / (1.0 + self._df)) + 1.0
+
+    # ---------- Lookup / store ----------
+    def lookup(self, question: str, language: str = "en") -> Optional[CachedAnswer]:
+        """Best cached answer for a paraphrase of `question`, or None."""
+        tf = self._features(question)
+        signature = question_signature(question)
+        with self._lock:
+            self.lookups += 1
+            if not self._slots or not tf.any():
+                return None
+            idf2 = self._idf() ** 2
+            # cosine of idf-weighted vectors: (q*idf)·(m*idf) / (|q*idf| |m*idf|)
+            dots = self._tf @ (tf * idf2)
+            norms = np.sqrt(self._tf2 @ idf2) * math.sqrt(float((tf ** 2) @ idf2))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                sims = np.where(norms > 0, dots / norms, 0.0)
+
+            k = min(self.top_k, len(sims))
+            top = np.argpartition(-sims, k - 1)[:k]
+            for slot in top[np.argsort(-sims[top])]:
+                similarity = float(sims[slot])
+                if similarity < self.threshold:
+                    break
+                entry = self._slots.get(int(slot))
+                if entry is None:
+                    continue
+                cached_question, answer, cached_signature, cached_language = entry
+                if cached_language == language and cached_signature == signature:
+                    self._slots.move_to_end(int(slot))
+                    self.hits += 1
+                    return CachedAnswer(answer, cached_question, round(similarity, 3))
+            return None
+
+    def store(self, question: str, answer: str, language: str = "en") -> None:
+        tf = self._features(question)
+        if not tf.any() or self.capacity <= 0:
+            return
+        with self._lock:
+            if not self._free:
+                evicted, _ = self._slots.popitem(last=False)
+                self._df -= self._tf[evicted] > 0
+                self._tf[evicted] = 0
+                self._tf2[evicted] = 0
+                self._free.append(evicted)
+                self.evictions += 1
+            slot = self._free.pop()
+            self._tf[slot] = tf
+            self._tf2[slot] = tf ** 2
+            self._df += tf > 0
+            self._slots[slot] = (question, answer, question_signature(question), language)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._slots),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,195 @@
+# ingredx/core/breaker.py
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .deadline import cut_short
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast when a backend is erroring or too slow.
+
+    The last `window` calls are kept as (failed, slow) outcomes. Once at least
+    `min_calls` are recorded (a full window by default, so a few unlucky calls
+    right after a reset cannot trip it), the circuit opens when the failure share reaches
+    `failure_threshold` or the share of calls slower than `slow_call_s`
+    reaches `slow_threshold`. While open every call raises CircuitOpenError
+    immediately. After `cooldown_s` recovery is checked either by `probe` on a
+    background thread (when given) or by letting a single trial call through
+    (half-open); success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str = "backend",
+        window: int = 20,
+        min_calls: Optional[int] = None,
+        failure_threshold: float = 0.5,
+        slow_call_s: float = 10.0,
+        slow_threshold: float = 0.5,
+        cooldown_s: float = 30.0,
+        probe: Optional[Callable[[], bool]] = None,
+    ):
+        self.name = name
+        self.min_calls = window if min_calls is None else min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_s = slow_call_s
+        self.slow_threshold = slow_threshold
+        self.cooldown_s = cooldown_s
+        self.probe = probe
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._trial_running = False
+        self._prober: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ---------- Gate ----------
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the half-open trial slot if it is free)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.probe is None and time.monotonic() - self.opened_at >= self.cooldown_s:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CLOSED
+
+    def call(self, fn: Callable[..., Any], *args, failed: Callable[[Any], bool] = lambda _: False, **kwargs) -> Any:
+        """Run fn through the breaker; `failed(result)` flags results that are errors in disguise."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._finish(False, started)
+            raise
+        self._finish(not failed(result), started)
+        return result
+
+    def _finish(self, ok: bool, started: float) -> None:
+        if not ok and cut_short():
+            # Cut short by the caller's deadline: says nothing about the backend
+            with self._lock:
+                self._trial_running = False
+            return
+        self.record(ok, time.monotonic() - started)
+
+    # ---------- Bookkeeping ----------
+    def record(self, ok: bool, seconds: float) -> None:
+        slow = seconds >= self.slow_call_s
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_running = False
+                if ok and not slow:
+                    self._close()
+                else:
+                    self._open()
+                return
+            if self.state == OPEN:
+                return  # a call that started before the trip
+            self._outcomes.append((not ok, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failures = sum(f for f, _ in self._outcomes) / len(self._outcomes)
+            slow_share = sum(s for _, s in self._outcomes) / len(self._outcomes)
+            if failures >= self.failure_threshold or slow_share >= self.slow_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+        if self.probe is not None and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+            self._prober.start()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.cooldown_s)
+            try:
+                healthy = bool(self.probe())
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy:
+                    self._close()
+                    return
+                self.opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._close()
+            self._trial_running = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(f for f, _ in self._outcomes),
+                "recent_slow": sum(s for _, s in self._outcomes),
+            }
+
+
+def _is_error_text(text: Any) -> bool:
+    return isinstance(text, str) and text.startswith("[Error")
+
+
+class GuardedSummarizer:
+    """Summarizer behind a circuit breaker; adapter "[Error: ...]" replies count as failures."""
+
+    def __init__(self, inner, breaker: CircuitBreaker):
+        self.inner = inner
+        self.breaker = breaker
+
+    def summarize(self, prompt: str, force_json: bool = False) -> str:
+        return self.breaker.call(self.inner.summarize, prompt, force_json=force_json, failed=_is_error_text)
+
+
+class GuardedTranslator:
+    """Translator behind a circuit breaker; language detection is local and always allowed."""
+
+    def __init__(self, inner, breaker: CircuitBreaker):
+        self.inner = inner
+        self.breaker = breaker
+
+    def detect_language(self, text: str) -> str:
+        return self.inner.detect_language(text)
+
+    def translate(self, text: str, target_language: str) -> str:
+        return self.breaker.call(self.inner.translate, text, target_language, failed=_is_error_text)
+
+    def translate_many(self, texts: List[str], target_language: str) -> List[str]:
+        batch = getattr(self.inner, "translate_many", None)
+        if batch is None:
+            return [self.translate(text, target_language) for text in texts]
+        return self.breaker.call(batch, texts, target_language, failed=lambda out: any(map(_is_error_text, out)))
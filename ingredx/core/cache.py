@@ -0,0 +1,290 @@
+# ingredx/core/cache.py
+from __future__ import annotations
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterator, MutableMapping, Optional, Protocol, TextIO, Tuple
+
+from .compact import CompactTable
+
+try:
+    import fcntl
+except ImportError:  # Windows: journal appends are still atomic, folding just isn't fenced
+    fcntl = None
+
+
+class RatingCache(Protocol):
+    """
+    Storage backend for the per-ingredient schema / safety rating cache.
+    Backends may also offer put(key, entry) for single-entry writes; the engine
+    uses it when present instead of save()-ing the whole mapping.
+    """
+
+    def load(self) -> MutableMapping[str, Dict[str, Any]]:
+        ...
+
+    def save(self, data: MutableMapping[str, Dict[str, Any]]) -> None:
+        ...
+
+
+class JsonFileCache:
+    """
+    Default backend: one JSON file on disk, shared by every engine pointed at it.
+
+    The JSON file is a snapshot; single-entry writes (put) are appended as JSON
+    lines to a journal next to it (`<path>.log`) instead of rewriting the file.
+    load() keeps the parsed data and only reads what changed on disk: new
+    journal lines when the journal grew, everything when the snapshot was
+    replaced. Once the journal outgrows `compact_bytes` (or half the snapshot)
+    it is folded into a fresh snapshot. With compact=True the data is held as a
+    CompactTable instead of a dict of dicts; the files are the same either way.
+    The snapshot is parsed one entry at a time, so loading never holds the
+    whole file, or the whole parsed dict, next to the compact table.
+    """
+
+    def __init__(
+        self,
+        path: str = "ingredx_cache.json",
+        compact: bool = False,
+        compression: Optional[str] = "zlib",
+        compact_bytes: int = 4 << 20,
+    ):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.compact = compact
+        self.compression = compression
+        self.compact_bytes = compact_bytes
+        self._data: Optional[MutableMapping[str, Dict[str, Any]]] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._log_offset = 0  # journal bytes already applied to _data
+        self._log_id: Optional[Tuple[int, int]] = None
+
+    def _empty(self) -> MutableMapping[str, Dict[str, Any]]:
+        return CompactTable(compression=self.compression) if self.compact else {}
+
+    @staticmethod
+    def _stat(path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        st = self._stat(self.path)
+        return None if st is None else (st.st_mtime_ns, st.st_size)
+
+    # ---------- Reading ----------
+    def load(self) -> MutableMapping[str, Dict[str, Any]]:
+        stamp = self._file_stamp()
+        log = self._stat(self.log_path)
+        log_id = None if log is None else (log.st_dev, log.st_ino)
+        stale = (
+            self._data is None
+            or stamp != self._stamp
+            or (self._log_offset and log_id != self._log_id)  # journal replaced under us
+            or (log is not None and log.st_size < self._log_offset)  # journal was folded in and truncated
+        )
+        if stale:
+            data = self._empty()
+            if stamp is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for key, entry in _SnapshotReader(f):
+                            data[key] = entry
+                except Exception:
+                    data = self._empty()
+            self._data, self._stamp, self._log_offset = data, stamp, 0
+        self._log_id = log_id
+        if log is not None and log.st_size > self._log_offset:
+            self._replay()
+        return self._data
+
+    def _replay(self) -> None:
+        """Apply journal lines written since the last read (ours included, in file order)."""
+        with open(self.log_path, "rb") as f:
+            f.seek(self._log_offset)
+            chunk = f.read()
+        complete = chunk.rfind(b"\n") + 1  # a writer may be mid-line; leave that for next time
+        for line in chunk[:complete].splitlines():
+            try:
+                record = json.loads(line)
+                self._data[record["k"]] = record["v"]
+            except Exception:
+                continue
+        self._log_offset += complete
+
+    # ---------- Writing ----------
+    def put(self, key: str, entry: Any) -> None:
+        """Write one entry: a single appended journal line, not a rewrite of the file."""
+        data = self.load()
+        line = (json.dumps({"k": key, "v": entry}, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                _lock(fd, shared=True)
+                os.write(fd, line)  # one O_APPEND write, so lines from other processes never interleave
+            finally:
+                os.close(fd)  # closing releases the lock
+        except Exception:
+            data[key] = entry  # unwritable location: keep it for this process
+            return
+        self.load()  # picks up our line (and anyone else's) in file order
+        log = self._stat(self.log_path)
+        snapshot = self._stamp[1] if self._stamp else 0
+        if log is not None and log.st_size > max(self.compact_bytes, snapshot // 2):
+            self._fold()
+
+    def _fold(self) -> None:
+        """Rewrite the snapshot with the journal applied, then empty the journal."""
+        try:
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        except OSError:
+            return
+        try:
+            _lock(fd, shared=False)  # no appends land between the final read and the truncate
+            data = self.load()
+            if self._write_snapshot(data):
+                os.ftruncate(fd, 0)
+                self._stamp, self._log_offset = self._file_stamp(), 0
+        finally:
+            os.close(fd)
+
+    def save(self, data: MutableMapping[str, Dict[str, Any]]) -> None:
+        """Replace the whole cache with `data` (snapshot rewrite; the journal is cleared)."""
+        try:
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        except OSError:
+            fd = None
+        try:
+            if fd is not None:
+                _lock(fd, shared=False)
+            if self._write_snapshot(data):
+                if fd is not None:
+                    os.ftruncate(fd, 0)
+                log = self._stat(self.log_path)
+                self._data, self._stamp, self._log_offset = data, self._file_stamp(), 0
+                self._log_id = None if log is None else (log.st_dev, log.st_ino)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _write_snapshot(self, data: MutableMapping[str, Dict[str, Any]]) -> bool:
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                if isinstance(data, dict):
+                    json.dump(data, f, indent=2)
+                else:
+                    # stream entry by entry so a compact table is never expanded all at once
+                    f.write("{")
+                    for i, key in enumerate(data):
+                        f.write(",\n" if i else "\n")
+                        f.write(json.dumps({key: data[key]}, indent=2)[2:-2])
+                    f.write("\n}" if len(data) else "}")
+            os.replace(tmp, self.path)
+            return True
+        except Exception:
+            return False
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _SnapshotReader:
+    """
+    (key, entry) pairs of a top-level JSON object, read in chunks and decoded one
+    entry at a time. Field names are interned: json.load shares them across one
+    document, but each entry here is its own decode and would get fresh copies.
+    """
+
+    def __init__(self, f: TextIO, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError("Snapshot keys must be strings")
+            self._expect(":")
+            entry = self._value()
+            if isinstance(entry, dict):
+                entry = {sys.intern(field): value for field, value in entry.items()}
+            yield key, entry
+            if self._expect(",}") == "}":
+                return
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character ("" at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed snapshot: expected one of {chars!r} at offset {self.pos}")
+        self.pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():  # value runs past the buffer
+                    continue
+                raise
+            if end == len(self.buf) and self._fill():
+                continue  # a number at the very end may have been cut short
+            self.pos = end
+            return value
+
+
+def _lock(fd: int, shared: bool) -> None:
+    """Advisory lock on the journal: appends share it, folding it into the snapshot is exclusive."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+
+class MemoryCache:
+    """In-process backend for tests, benchmarks and throwaway engines (no disk I/O)."""
+
+    def __init__(
+        self,
+        data: Dict[str, Dict[str, Any]] | None = None,
+        compact: bool = False,
+        compression: Optional[str] = "zlib",
+    ):
+        if compact:
+            data = CompactTable(data, compression=compression)
+        self.data: MutableMapping[str, Dict[str, Any]] = data if data is not None else {}
+
+    def load(self) -> MutableMapping[str, Dict[str, Any]]:
+        return self.data
+
+    def save(self, data: MutableMapping[str, Dict[str, Any]]) -> None:
+        self.data = data
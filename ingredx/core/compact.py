@@ -0,0 +1,154 @@
+# ingredx/core/compact.py
+from __future__ import annotations
+import json
+import math
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
+
+# Seed for the compressor: per-entry blobs are small, so a preset dictionary
+# pays off. It holds only the entry layout (field names and separators exactly
+# as __setitem__ serializes them); no sample prose, which would flatter one
+# corpus and fit real LLM text no better than nothing.
+_ZDICT_FIELDS = (
+    "common_synonyms", "chemical_properties", "common_uses",
+    "safety_and_controversy", "environmental_and_regulation", "_blurb",
+)
+_ZDICT = ('{"' + '":"","'.join(_ZDICT_FIELDS) + '":""}').encode("utf-8")
+
+_RATING = "health_safety_rating"
+_EDIBLE = "edible"
+_NO_RATING = math.nan
+_NO_EDIBLE = -1
+
+
+class _Codec:
+    """Text compression for entry blobs: zstd when installed and asked for, else zlib, or none."""
+
+    def __init__(self, name: Optional[str], level: int):
+        self.name = name
+        self.level = level
+        self._zstd = None
+        if name == "zstd":
+            try:
+                import zstandard
+
+                zdict = zstandard.ZstdCompressionDict(_ZDICT, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+                self._zstd = (
+                    zstandard.ZstdCompressor(level=level, dict_data=zdict),
+                    zstandard.ZstdDecompressor(dict_data=zdict),
+                )
+            except ImportError:
+                self.name = "zlib"
+        elif name not in (None, "zlib"):
+            raise ValueError(f"Unknown compression '{name}' (expected zlib, zstd or None)")
+
+    def encode(self, text: str) -> bytes:
+        raw = text.encode("utf-8")
+        if self.name is None:
+            return raw
+        if self._zstd is not None:
+            return self._zstd[0].compress(raw)
+        packer = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=_ZDICT)
+        return packer.compress(raw) + packer.flush()
+
+    def decode(self, blob: bytes) -> str:
+        if self.name is None:
+            return blob.decode("utf-8")
+        if self._zstd is not None:
+            return self._zstd[1].decompress(blob).decode("utf-8")
+        unpacker = zlib.decompressobj(-15, zdict=_ZDICT)
+        return (unpacker.decompress(blob) + unpacker.flush()).decode("utf-8")
+
+
+class CompactTable(MutableMapping):
+    """
+    Memory-compact stand-in for the rating cache's {name: entry} dict.
+
+    Keys are interned and map to a row number. health_safety_rating and edible
+    live in typed array columns; everything else in an entry (the free-text
+    schema fields, the blurb, any extras) is stored as one compressed JSON blob
+    per row and only decompressed when that entry is read. Reads return a fresh
+    dict, so callers mutate-then-assign exactly as they would with a plain dict.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Dict[str, Any]]] = None, compression: Optional[str] = "zlib", level: int = 6):
+        self._codec = _Codec(compression, level)
+        self._rows: Dict[str, int] = {}
+        self._ratings = array("d")
+        self._edible = array("b")
+        self._blobs: List[Optional[bytes]] = []
+        self._free: List[int] = []
+        if data:
+            self.update(data)
+
+    @property
+    def compression(self) -> Optional[str]:
+        return self._codec.name
+
+    # ---------- Mapping protocol ----------
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        row = self._rows[key]
+        blob = self._blobs[row]
+        entry: Dict[str, Any] = json.loads(self._codec.decode(blob)) if blob else {}
+        rating = self._ratings[row]
+        if not math.isnan(rating):
+            entry[_RATING] = rating
+        if self._edible[row] != _NO_EDIBLE:
+            entry[_EDIBLE] = bool(self._edible[row])
+        return entry
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]) -> None:
+        rest = dict(entry)
+        rating = rest.get(_RATING)
+        if isinstance(rating, (int, float)) and not isinstance(rating, bool):
+            rating = float(rest.pop(_RATING))
+        else:
+            rating = _NO_RATING
+        edible = rest.get(_EDIBLE)
+        if isinstance(edible, bool):
+            edible = int(rest.pop(_EDIBLE))
+        else:
+            edible = _NO_EDIBLE
+        blob = self._codec.encode(json.dumps(rest, ensure_ascii=False, separators=(",", ":"))) if rest else None
+
+        row = self._rows.get(key)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._blobs)
+                self._ratings.append(_NO_RATING)
+                self._edible.append(_NO_EDIBLE)
+                self._blobs.append(None)
+            self._rows[sys.intern(key)] = row
+        self._ratings[row] = rating
+        self._edible[row] = edible
+        self._blobs[row] = blob
+
+    def __delitem__(self, key: str) -> None:
+        row = self._rows.pop(key)
+        self._blobs[row] = None
+        self._ratings[row] = _NO_RATING
+        self._edible[row] = _NO_EDIBLE
+        self._free.append(row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    # ---------- Column access (no decompression) ----------
+    def rating(self, key: str) -> Optional[float]:
+        row = self._rows.get(key)
+        if row is None or math.isnan(self._ratings[row]):
+            return None
+        return self._ratings[row]
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {key: self[key] for key in self._rows}
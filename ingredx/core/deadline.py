@@ -0,0 +1,123 @@
+# ingredx/core/deadline.py
+from __future__ import annotations
+import contextvars
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Floor for per-call timeouts: a backend call that cannot finish in this much
+# time is not worth starting, and 0 means "no timeout" to several clients.
+MIN_CALL_TIMEOUT_S = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before the pipeline finished."""
+
+
+class RequestCancelled(DeadlineExceeded):
+    """The caller went away (e.g. the client disconnected); nobody wants the result."""
+
+
+class Deadline:
+    """
+    End-to-end time budget for one request.
+
+    `seconds=None` means no budget (only cancellation applies). Pipeline stages
+    call check() between steps, backend adapters size their per-call timeouts
+    with timeout(), and cancel() makes every later check fail at once.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self._cancelled = threading.Event()
+        self.caps_calls = True
+
+    def uncapped(self) -> "Deadline":
+        """
+        This deadline for work that may outlive the request (e.g. filling the cache):
+        it fails the same checks, so nothing new starts once time is up, but a call
+        already started keeps the adapter's own timeout instead of being cut off.
+        """
+        view = copy.copy(self)  # shares the cancellation event
+        view.caps_calls = False
+        return view
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (0 once cancelled), or None without a budget."""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def check(self, stage: str = "request") -> None:
+        if self.cancelled:
+            raise RequestCancelled(f"Request cancelled before {stage}")
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded before {stage}")
+
+    def timeout(self, default: Optional[float], stage: str = "backend call") -> Optional[float]:
+        """Per-call timeout: the smaller of `default` and the time left; raises when none is left."""
+        self.check(stage)
+        remaining = self.remaining()
+        if remaining is None or not self.caps_calls:
+            return default
+        remaining = max(remaining, MIN_CALL_TIMEOUT_S)
+        return remaining if default is None else min(default, remaining)
+
+
+# The deadline of the request being served on this thread (copied into worker
+# threads by whoever hands them work), so adapters need no extra arguments.
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("ingredx_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_deadline(stage: str = "request") -> None:
+    """Raise DeadlineExceeded / RequestCancelled if the current request is out of time."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def call_timeout(default: Optional[float], stage: str = "backend call") -> Optional[float]:
+    """Timeout for one backend call under the current deadline (`default` when there is none)."""
+    deadline = _current.get()
+    return default if deadline is None else deadline.timeout(default, stage)
+
+
+def deadline_expired() -> bool:
+    """True when the current request has run out of time or was cancelled."""
+    deadline = _current.get()
+    return deadline is not None and deadline.expired
+
+
+def cut_short() -> bool:
+    """True when the current deadline has run out and was capping backend calls, so a failed call may just have been cut off."""
+    deadline = _current.get()
+    return deadline is not None and deadline.caps_calls and deadline.expired
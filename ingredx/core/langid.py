@@ -0,0 +1,231 @@
+# ingredx/core/langid.py
+from __future__ import annotations
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# ---------------------------------------------------------------------
+# TRAINING SNIPPETS
+# ---------------------------------------------------------------------
+# Label-flavoured samples per language: ingredient and additive names plus
+# packaging phrases, since most of a label is ingredient names. Profiles are built from these
+# on first use, so detection needs no data files, network or model download.
+
+SAMPLES: Dict[str, str] = {
+    "en": (
+        "milk cream cultures enzymes cheese butter whey eggs yolks sodium chloride potassium iodide "
+        "dextrose maltodextrin modified starch citric acid ascorbic acid sodium benzoate potassium sorbate "
+        "soybean oil palm oil canola oil sunflower lecithin xanthan gum guar gum carrageenan yeast extract "
+        "artificial colors caramel color titanium dioxide monosodium glutamate vitamins minerals reduced iron "
+        "niacin riboflavin thiamin folic acid baking soda garlic powder onion powder spices vinegar "
+        "nutrition facts serving size distributed by keep refrigerated best before produced in a facility that processes "
+        "ingredients water sugar salt wheat flour corn syrup vegetable oil natural flavors "
+        "contains milk and soy may contain traces of tree nuts store in a cool dry place "
+        "the product is made with the best quality and should be consumed before the date "
+        "this is what it does and how it works with other things in the food"
+    ),
+    "es": (
+        "leche nata cultivos enzimas queso mantequilla suero huevos yemas cloruro de sodio yoduro de potasio "
+        "dextrosa maltodextrina almidón modificado ácido cítrico ácido ascórbico benzoato de sodio sorbato de potasio "
+        "aceite de soja aceite de palma lecitina de girasol goma xantana goma guar carragenina extracto de levadura "
+        "colorantes caramelo dióxido de titanio glutamato monosódico vitaminas minerales hierro "
+        "ajo en polvo cebolla en polvo especias vinagre información nutricional porción mantener refrigerado "
+        "ingredientes agua azúcar sal harina de trigo jarabe de maíz aceite vegetal aromas naturales "
+        "contiene leche y soja puede contener trazas de frutos secos conservar en un lugar fresco y seco "
+        "el producto está elaborado con la mejor calidad y debe consumirse antes de la fecha "
+        "esto es lo que hace y cómo funciona con otras cosas en los alimentos"
+    ),
+    "fr": (
+        "lait crème ferments enzymes fromage beurre lactosérum œufs jaunes chlorure de sodium iodure de potassium "
+        "dextrose maltodextrine amidon modifié acide citrique acide ascorbique benzoate de sodium sorbate de potassium "
+        "huile de soja huile de palme lécithine de tournesol gomme xanthane gomme guar carraghénanes extrait de levure "
+        "colorants caramel dioxyde de titane glutamate monosodique vitamines minéraux fer "
+        "ail en poudre oignon en poudre épices vinaigre valeurs nutritionnelles portion à conserver au frais "
+        "ingrédients eau sucre sel farine de blé sirop de maïs huile végétale arômes naturels "
+        "contient du lait et du soja peut contenir des traces de fruits à coque à conserver dans un endroit frais et sec "
+        "le produit est fabriqué avec la meilleure qualité et doit être consommé avant la date "
+        "voici ce que cela fait et comment cela fonctionne avec les autres choses dans les aliments"
+    ),
+    "de": (
+        "milch sahne kulturen enzyme käse butter molke eier eigelb natriumchlorid kaliumjodid "
+        "traubenzucker maltodextrin modifizierte stärke citronensäure ascorbinsäure natriumbenzoat kaliumsorbat "
+        "sojaöl palmöl sonnenblumenlecithin xanthan guarkernmehl carrageen hefeextrakt "
+        "farbstoffe zuckerkulör titandioxid mononatriumglutamat vitamine mineralstoffe eisen "
+        "knoblauchpulver zwiebelpulver gewürze essig nährwerte portion gekühlt aufbewahren "
+        "zutaten wasser zucker salz weizenmehl maissirup pflanzenöl natürliche aromen "
+        "enthält milch und soja kann spuren von schalenfrüchten enthalten kühl und trocken lagern "
+        "das produkt wird mit der besten qualität hergestellt und sollte vor dem datum verzehrt werden "
+        "das ist was es tut und wie es mit anderen dingen im lebensmittel wirkt"
+    ),
+    "it": (
+        "latte panna fermenti enzimi formaggio burro siero uova tuorli cloruro di sodio ioduro di potassio "
+        "destrosio maltodestrine amido modificato acido citrico acido ascorbico benzoato di sodio sorbato di potassio "
+        "olio di soia olio di palma lecitina di girasole gomma di xantano gomma di guar carragenina estratto di lievito "
+        "coloranti caramello biossido di titanio glutammato monosodico vitamine minerali ferro "
+        "aglio in polvere cipolla in polvere spezie aceto valori nutrizionali porzione conservare in frigorifero "
+        "ingredienti acqua zucchero sale farina di frumento sciroppo di mais olio vegetale aromi naturali "
+        "contiene latte e soia può contenere tracce di frutta a guscio conservare in luogo fresco e asciutto "
+        "il prodotto è realizzato con la migliore qualità e deve essere consumato prima della data "
+        "questo è quello che fa e come funziona con le altre cose negli alimenti"
+    ),
+    "pt": (
+        "leite natas culturas enzimas queijo manteiga soro ovos gemas cloreto de sódio iodeto de potássio "
+        "dextrose maltodextrina amido modificado ácido cítrico ácido ascórbico benzoato de sódio sorbato de potássio "
+        "óleo de soja óleo de palma lecitina de girassol goma xantana goma guar carragenina extrato de levedura "
+        "corantes caramelo dióxido de titânio glutamato monossódico vitaminas minerais ferro "
+        "alho em pó cebola em pó especiarias vinagre informação nutricional porção manter refrigerado "
+        "ingredientes água açúcar sal farinha de trigo xarope de milho óleo vegetal aromas naturais "
+        "contém leite e soja pode conter traços de frutos de casca rija conservar em local fresco e seco "
+        "o produto é feito com a melhor qualidade e deve ser consumido antes da data "
+        "isto é o que faz e como funciona com outras coisas nos alimentos"
+    ),
+    "nl": (
+        "melk room culturen enzymen kaas boter wei eieren eidooiers natriumchloride kaliumjodide "
+        "dextrose maltodextrine gemodificeerd zetmeel citroenzuur ascorbinezuur natriumbenzoaat kaliumsorbaat "
+        "sojaolie palmolie zonnebloemlecithine xanthaangom guarpitmeel carrageen gistextract "
+        "kleurstoffen karamel titaandioxide mononatriumglutamaat vitaminen mineralen ijzer "
+        "knoflookpoeder uienpoeder specerijen azijn voedingswaarde portie gekoeld bewaren "
+        "ingrediënten water suiker zout tarwebloem maïssiroop plantaardige olie natuurlijke aroma's "
+        "bevat melk en soja kan sporen van noten bevatten koel en droog bewaren "
+        "het product is gemaakt met de beste kwaliteit en moet voor de datum worden geconsumeerd "
+        "dit is wat het doet en hoe het werkt met andere dingen in het voedsel"
+    ),
+}
+
+# Words that head an ingredient list. A label's header is strong evidence for its
+# language, but OCR drops accents ("Ingredients" for "Ingrédients"), so it only
+# wins unless the text itself clearly scores as something else.
+HEADER_WORDS: Dict[str, Tuple[str, ...]] = {
+    "ingredients": ("en",),
+    "ingrédients": ("fr",),
+    "ingredientes": ("es", "pt"),
+    "zutaten": ("de",),
+    "ingredienti": ("it",),
+    "ingrediënten": ("nl",),
+    "ingredienten": ("nl",),
+}
+
+# Scripts that identify a language (or close family) on their own
+SCRIPT_LANGUAGES = [
+    ("CJK UNIFIED", "zh"),
+    ("HIRAGANA", "ja"),
+    ("KATAKANA", "ja"),
+    ("HANGUL", "ko"),
+    ("CYRILLIC", "ru"),
+    ("GREEK", "el"),
+    ("ARABIC", "ar"),
+    ("HEBREW", "he"),
+    ("DEVANAGARI", "hi"),
+    ("THAI", "th"),
+]
+
+
+def _ngrams(text: str, n: int = 3) -> Counter:
+    words = re.findall(r"[^\W\d_]+", text.lower())
+    grams: Counter = Counter()
+    for w in words:
+        padded = f" {w} "
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+class NgramLanguageDetector:
+    """
+    CPU-only language identification by character trigram profile scoring
+    (cosine similarity against per-language profiles), with a Unicode script
+    shortcut for non-Latin alphabets.
+    """
+
+    def __init__(
+        self,
+        samples: Optional[Dict[str, str]] = None,
+        default: str = "en",
+        min_letters: int = 12,
+        tie_margin: float = 0.05,
+        header_margin: float = 0.2,
+    ):
+        self.default = default
+        self.min_letters = min_letters  # shorter inputs are too ambiguous to score
+        self.tie_margin = tie_margin  # near-ties with the default language go to the default
+        self.header_margin = header_margin  # how clearly the text must outscore its header's language
+        self._samples = samples or SAMPLES
+        self._profiles: Optional[Dict[str, Tuple[Counter, float]]] = None
+
+    def _load_profiles(self) -> Dict[str, Tuple[Counter, float]]:
+        if self._profiles is None:
+            profiles = {}
+            for lang, sample in self._samples.items():
+                grams = _ngrams(sample)
+                profiles[lang] = (grams, math.sqrt(sum(v * v for v in grams.values())))
+            self._profiles = profiles
+        return self._profiles
+
+    @staticmethod
+    def _script_language(text: str) -> Optional[str]:
+        counts: Counter = Counter()
+        for ch in text:
+            if ch.isalpha() and ord(ch) > 0x24F:
+                name = unicodedata.name(ch, "")
+                for prefix, lang in SCRIPT_LANGUAGES:
+                    if name.startswith(prefix):
+                        counts[lang] += 1
+                        break
+        if not counts:
+            return None
+        lang, hits = counts.most_common(1)[0]
+        letters = sum(1 for ch in text if ch.isalpha())
+        if hits * 2 < letters:
+            return None
+        # Kana anywhere means Japanese even when kanji dominate
+        return "ja" if counts.get("ja") else lang
+
+    @staticmethod
+    def _header_languages(text: str) -> Tuple[str, ...]:
+        """Languages named by the ingredient-list header(s) in the text; empty for none or several."""
+        found = {HEADER_WORDS[w] for w in re.findall(r"[^\W\d_]+", text.lower()) if w in HEADER_WORDS}
+        return found.pop() if len(found) == 1 else ()
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """Cosine similarity to every profile, best first."""
+        grams = _ngrams(text)
+        norm = math.sqrt(sum(v * v for v in grams.values()))
+        if not norm:
+            return []
+        ranked = []
+        for lang, (profile, pnorm) in self._load_profiles().items():
+            dot = sum(count * profile.get(g, 0) for g, count in grams.items())
+            ranked.append((lang, dot / (norm * pnorm)))
+        ranked.sort(key=lambda kv: kv[1], reverse=True)
+        return ranked
+
+    def detect_with_confidence(self, text: str) -> Tuple[str, float]:
+        """
+        Return (ISO 639-1 code, confidence 0–1); confidence is the margin over the
+        runner-up, or how little the text disagrees with its ingredient-list header.
+        """
+        script = self._script_language(text)
+        if script:
+            return script, 1.0
+        if sum(1 for ch in text if ch.isalpha()) < self.min_letters:
+            return self.default, 0.0
+        ranked = self.scores(text)
+        if not ranked or ranked[0][1] == 0:
+            return self.default, 0.0
+        best, best_score = ranked[0]
+        header = self._header_languages(text)
+        if header and best not in header:
+            by_lang = dict(ranked)
+            claimed = max(header, key=lambda lang: by_lang.get(lang, 0.0))
+            if (best_score - by_lang.get(claimed, 0.0)) / best_score < self.header_margin:
+                return claimed, 1.0 - (best_score - by_lang.get(claimed, 0.0)) / best_score
+        runner_up, runner_score = ranked[1] if len(ranked) > 1 else (None, 0.0)
+        margin = (best_score - runner_score) / best_score
+        if runner_up == self.default and margin < self.tie_margin:
+            return self.default, margin
+        return best, margin
+
+    def detect(self, text: str) -> str:
+        return self.detect_with_confidence(text)[0]
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import List, Optional, Dict, Any, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from .schema import coerce_bool, coerce_rating
 
 
 class Reference(BaseModel):
@@ -41,6 +43,31 @@ class Explanation(BaseModel):
     detail_level: DetailLevel
     language: str
     text: str
+    cached: bool = False  # served without an LLM call
+    degraded: bool = False  # a backend circuit was open; cache / KB data only
+
+
+class IngredientSchema(BaseModel):
+    """Validated output of "schema" mode; numeric/boolean strings are coerced on the way in."""
+    common_synonyms: Optional[str] = None
+    chemical_properties: str = ""
+    common_uses: str = ""
+    safety_and_controversy: str = ""
+    environmental_and_regulation: str = ""
+    health_safety_rating: float = Field(ge=0, le=1)
+    edible: bool
+
+    @field_validator("health_safety_rating", mode="before")
+    @classmethod
+    def _rating(cls, v: Any) -> Any:
+        coerced = coerce_rating(v)
+        return v if coerced is None else coerced
+
+    @field_validator("edible", mode="before")
+    @classmethod
+    def _edible(cls, v: Any) -> Any:
+        coerced = coerce_bool(v)
+        return v if coerced is None else coerced
 
 
 class IngredientAnalysis(BaseModel):
@@ -48,6 +75,7 @@ class IngredientAnalysis(BaseModel):
     translated_name: Optional[str] = None
     match: Optional[MatchResult] = None
     data: Optional[IngredientRecord] = None
+    structured: Optional[IngredientSchema] = None  # parsed schema-mode output
     explanation: Explanation
     disclaimer: str
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import Optional
-from .models import IngredientRecord
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
 
 # ---------------------------------------------------------------------
 # CONSTANTS
@@ -11,90 +12,207 @@ DISCLAIMER = (
     "For specific health concerns, consult a qualified professional."
 )
 
-SYSTEM_SUMMARY = (
-    "You are a scientific ingredient analyst. "
-    "Your goal is to produce accurate, layperson-friendly yet scientifically grounded explanations "
-    "about cosmetic, food, and chemical ingredients. Avoid pseudoscience and always stay factual."
+# Providers only cache prompt prefixes from this length on (OpenAI: 1024 tokens)
+PROVIDER_MIN_CACHEABLE_TOKENS = 1024
+
+# ---------------------------------------------------------------------
+# TEMPLATES
+# ---------------------------------------------------------------------
+# Every template is a short static instruction prefix followed by a variable
+# payload. Keeping all per-call data (ingredient, rating, language, history)
+# at the end gives every call of a template a byte-identical prefix. These
+# prefixes are a few hundred characters, far below the provider's caching
+# minimum, so there is no provider-side discount: what pays is keeping the
+# instructions terse. Don't pad them to reach the minimum. Bump `version` when
+# the instruction text changes so stats and cached outputs can be told apart.
+
+
+class RenderedPrompt(NamedTuple):
+    template: str
+    version: int
+    prefix: str
+    payload: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.payload
+
+
+class PromptTemplate:
+    def __init__(self, name: str, version: int, instructions: str, payload: str):
+        self.name = name
+        self.version = version
+        self.prefix = instructions.rstrip() + "\n\n"
+        self.payload = payload
+
+    def render(self, **fields) -> RenderedPrompt:
+        return RenderedPrompt(self.name, self.version, self.prefix, self.payload.format(**fields))
+
+
+_BLURB = PromptTemplate(
+    "blurb", 3,
+    "In at most 2 friendly, jargon-free sentences, say what the ingredient below is, what it "
+    "does and any general safety concerns. No numeric ratings or scores. Reply in the given language.",
+    "Ingredient: '{name}'\nLanguage: {language}",
+)
+
+_OVERVIEW = PromptTemplate(
+    "overview", 3,
+    "Write a scientifically grounded overview of the ingredient below for laypeople:\n"
+    "1) Synonyms\n"
+    "2) Chemical properties and function\n"
+    "3) Common uses\n"
+    "4) Safety and controversy\n"
+    "5) Environment and regulation\n"
+    "6) Health-safety rating (0–1; keep any established one)\n"
+    "7) Edible (yes/no)\n"
+    "Reply in the given language.",
+    "Ingredient: '{name}'\n{rating_line}Language: {language}",
+)
+
+_SCHEMA = PromptTemplate(
+    "schema", 3,
+    "Return ONLY a JSON object, no markdown or commentary, for the ingredient below:\n"
+    '{"chemical_properties": str, "common_uses": str, "safety_and_controversy": str, '
+    '"environmental_and_regulation": str, "health_safety_rating": 0-1 decimal, "edible": bool}\n'
+    "Keep any established rating.",
+    "Ingredient: '{name}'\n{rating_line}",
+)
+
+_SCHEMA_FIELDS = PromptTemplate(
+    "schema_fields", 2,
+    "Return ONLY a JSON object, no markdown or commentary, with exactly the missing fields of the "
+    "ingredient below: text fields as plain strings, health_safety_rating a 0-1 decimal, edible a "
+    "bool. Keep any established rating.",
+    "Ingredient: '{name}'\n{rating_line}Missing fields: {fields}",
+)
+
+_CHAT = PromptTemplate(
+    "chat", 3,
+    "You are a friendly, scientifically accurate ingredient assistant. Continue the conversation "
+    "below, conversational but precise: chemistry and function, uses, safety, environment and "
+    "regulation, or fun facts. Reply in the given language.",
+    "Conversation so far:\n{history}\n\nLanguage: {language}",
+)
+
+_SUGGESTIONS = PromptTemplate(
+    "suggestions", 3,
+    "Suggest 3-5 concise follow-up questions the user might ask next about the conversation "
+    "below. Return ONLY a numbered list.",
+    "Conversation so far:\n{history}",
 )
 
+TEMPLATES: Dict[str, PromptTemplate] = {
+    t.name: t for t in (_BLURB, _OVERVIEW, _SCHEMA, _SCHEMA_FIELDS, _CHAT, _SUGGESTIONS)
+}
+
+
+def render(template: str, **fields) -> RenderedPrompt:
+    """Render the current version of a named template."""
+    try:
+        return TEMPLATES[template].render(**fields)
+    except KeyError:
+        raise ValueError(f"Unknown mode '{template}'") from None
+
+
+def rating_line(known_rating: Optional[float]) -> str:
+    if known_rating is None:
+        return ""
+    return f"Established rating: {known_rating:.2f}\n"
+
+
 # ---------------------------------------------------------------------
-# PROMPT BUILDER
+# TOKEN ACCOUNTING
 # ---------------------------------------------------------------------
 
-def build_prompt(
-    rec: Optional[IngredientRecord],
-    matched_name: Optional[str],
-    language: str,
-    mode: str = "overview",  # "blurb" | "overview" | "schema" | "chat"
-) -> str:
+_ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+_encoder = None
+
+
+def _encoding_on_disk() -> bool:
+    """Whether tiktoken already has the o200k_base file in its cache (same lookup as tiktoken.load)."""
+    import hashlib
+    import tempfile
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return False
+    return os.path.exists(os.path.join(cache_dir, hashlib.sha1(_ENCODING_URL.encode()).hexdigest()))
+
+
+def count_tokens(text: str) -> int:
     """
-    Build a language-specific LLM prompt for one of four modes:
-      - blurb: 2-sentence summary
-      - overview: detailed, human-readable analysis
-      - schema: structured JSON
-      - chat: conversational Q&A mode
+    Token count via tiktoken when installed and its encoding is already on disk,
+    else the ~4 chars/token rule of thumb. A missing encoding is never fetched:
+    get_encoding() would download it inside whichever request counts first.
     """
-    ingredient_name = rec.name if rec else matched_name or "unknown ingredient"
-
-    if mode == "blurb":
-        task = (
-            "Write a short, friendly, and accurate 2-sentence summary of the ingredient below. "
-            "Explain what it is and what it does, including general safety information in plain terms. "
-            "Do NOT include numeric safety ratings or decimal scores. Avoid jargon. "
-            "Keep the tone approachable and clear for everyday consumers."
-        )
-
-    elif mode == "overview":
-        task = (
-            "Provide a detailed but readable scientific overview of this ingredient. "
-            "Organize your response into the following sections:\n"
-            "1. Common Synonyms / Other Names\n"
-            "2. Chemical Properties and Function\n"
-            "3. Common Uses\n"
-            "4. Safety and Controversy Information\n"
-            "5. Environmental and Regulatory Considerations\n"
-            "6. Overall Health Safety Rating (decimal 0–1)\n"
-            "7. Edibility (yes/no, is it safe for human consumption)\n\n"
-            "Use full sentences and natural formatting — no bullet points, no JSON. "
-            "Write clearly, using accessible language grounded in science."
-        )
-
-    elif mode == "schema":
-        task = (
-            "Return ONLY valid JSON (no markdown, no code blocks, no commentary). "
-            "The JSON must include the following keys with scientifically accurate values:\n\n"
-            "{\n"
-            '  "common_synonyms": "comma-separated list of known synonyms",\n'
-            '  "chemical_properties": "description of structure, function, and key characteristics",\n'
-            '  "common_uses": "description of typical household, industrial, or biological uses",\n'
-            '  "safety_and_controversy": "discussion of health risks, debates, or restrictions",\n'
-            '  "environmental_and_regulation": "notes on biodegradability, eco-toxicity, and legal status",\n'
-            '  "health_safety_rating": float between 0 and 1,\n'
-            '  "edible": boolean (true/false)\n'
-            "}\n\n"
-            "Output ONLY the JSON object, nothing else. No markdown or commentary."
-        )
-
-    elif mode == "chat":
-        task = (
-            "You are a friendly, scientifically accurate health and nutrition assistant. "
-            "Engage in a natural conversation with the user about ingredient safety, chemical properties, and usage. "
-            "Always ground your responses in real chemistry, toxicology, or nutrition science. "
-            "Focus on explaining clearly:\n"
-            "1. Chemical Properties and Function\n"
-            "2. Common Uses\n"
-            "3. Safety and Controversy\n"
-            "4. Environmental and Regulatory Considerations\n\n"
-            "Answer conversationally, but stay factual and balanced. "
-            "If unsure, say what is and isn’t known. Keep the tone approachable and warm."
-        )
+    global _encoder
+    if _encoder is None:
+        _encoder = False
+        try:
+            import tiktoken
+            if _encoding_on_disk():
+                _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            pass
+    if _encoder:
+        return len(_encoder.encode(text))
+    return max(1, (len(text) + 3) // 4)
 
-    else:
-        raise ValueError(f"Unknown mode: {mode}")
-
-    return (
-        f"{SYSTEM_SUMMARY}\n\n"
-        f"Language: {language}\n"
-        f"Ingredient or topic: {ingredient_name}\n\n"
-        f"Task: {task}"
-    )
\ No newline at end of file
+
+class PromptStats:
+    """
+    Per-call prompt token accounting. A call's prefix counts as cache-eligible
+    when the same prefix was already sent earlier in the process; it counts as
+    provider-cacheable only if it is also long enough for the provider to cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefix_tokens: Dict[str, int] = {}
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.prefix_tokens = 0
+        self.eligible_tokens = 0
+        self.provider_cacheable_tokens = 0
+        self.by_template: Dict[str, Dict[str, int]] = {}
+
+    def record(self, prompt: RenderedPrompt) -> int:
+        """Account for one call; returns its prompt token count."""
+        payload_tokens = count_tokens(prompt.payload)
+        with self._lock:
+            seen = prompt.prefix in self._prefix_tokens
+            if not seen:
+                self._prefix_tokens[prompt.prefix] = count_tokens(prompt.prefix)
+            prefix_tokens = self._prefix_tokens[prompt.prefix]
+            total = prefix_tokens + payload_tokens
+
+            self.calls += 1
+            self.prompt_tokens += total
+            self.prefix_tokens += prefix_tokens
+            if seen:
+                self.eligible_tokens += prefix_tokens
+                if prefix_tokens >= PROVIDER_MIN_CACHEABLE_TOKENS:
+                    self.provider_cacheable_tokens += prefix_tokens
+
+            per = self.by_template.setdefault(f"{prompt.template}@v{prompt.version}", {"calls": 0, "tokens": 0})
+            per["calls"] += 1
+            per["tokens"] += total
+        return total
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.prompt_tokens or 1
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.calls, 1) if self.calls else 0.0,
+                "static_prefix_share": round(self.prefix_tokens / total, 3),
+                "prefix_cache_eligible_share": round(self.eligible_tokens / total, 3),
+                "provider_cacheable_share": round(self.provider_cacheable_tokens / total, 3),
+                "by_template": {k: dict(v) for k, v in self.by_template.items()},
+            }
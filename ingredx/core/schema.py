@@ -0,0 +1,211 @@
+# ingredx/core/schema.py
+from __future__ import annotations
+import ast
+import json
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Fields the schema prompt asks for; a cache entry with all of them is complete
+REQUIRED_FIELDS = (
+    "chemical_properties",
+    "common_uses",
+    "safety_and_controversy",
+    "environmental_and_regulation",
+    "health_safety_rating",
+    "edible",
+)
+TEXT_FIELDS = (
+    "common_synonyms",
+    "chemical_properties",
+    "common_uses",
+    "safety_and_controversy",
+    "environmental_and_regulation",
+)
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class SchemaResult(NamedTuple):
+    fields: Dict[str, Any]
+    missing: List[str]
+    repaired: bool
+
+    def merge(self, other: "SchemaResult") -> "SchemaResult":
+        """Fill this result's missing fields from a follow-up response."""
+        fields = {**other.fields, **self.fields}
+        missing = [f for f in REQUIRED_FIELDS if f not in fields]
+        return SchemaResult(fields, missing, self.repaired or other.repaired)
+
+
+# ---------------------------------------------------------------------
+# LOCAL REPAIR
+# ---------------------------------------------------------------------
+
+
+def _loads_lenient(text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Parse a JSON object, tolerating fences, prose around it, trailing commas and Python literals."""
+    try:
+        obj = json.loads(text)
+        if isinstance(obj, dict):
+            return obj, False
+    except Exception:
+        pass
+
+    candidate = _FENCE.sub("", text)
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end <= start:
+        return None, True
+    candidate = re.sub(r",\s*([}\]])", r"\1", candidate[start:end + 1])
+
+    try:
+        obj = json.loads(candidate)
+    except Exception:
+        # single-quoted keys/strings: read it as a Python literal instead
+        literal = re.sub(r"\btrue\b", "True", candidate)
+        literal = re.sub(r"\bfalse\b", "False", literal)
+        literal = re.sub(r"\bnull\b", "None", literal)
+        try:
+            obj = ast.literal_eval(literal)
+        except Exception:
+            return None, True
+    return (obj, True) if isinstance(obj, dict) else (None, True)
+
+
+_FRACTION = re.compile(r"(-?\d+(?:\.\d+)?)\s*(?:/|out\s+of|of)\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_YES, _NO = {"yes", "true"}, {"no", "false"}
+_POSITIVE = _YES | {"edible", "safe"}
+_NEGATIVE = _NO | {"not", "non", "never", "inedible", "unsafe"}
+
+
+def coerce_rating(value: Any) -> Optional[float]:
+    """
+    0.8, "0.8", "80%", "8/10", "4 out of 5" and "about 0.8 overall" all become 0.8.
+    A bare number above 1 could be on a 5, 10 or 100 point scale, so only values
+    over 10 are read as percentages; anything ambiguous or out of range is None
+    (left missing for the re-ask) rather than guessed.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        fraction = _FRACTION.search(value)
+        if fraction:
+            part, whole = float(fraction.group(1)), float(fraction.group(2))
+            return round(part / whole, 3) if 0 <= part <= whole and whole > 0 else None
+        found = _NUMBER.findall(value)
+        if len(found) != 1:
+            return None  # no number, or a range / several readings
+        number = float(found[0])
+        if "%" in value:
+            number /= 100
+    else:
+        return None
+    if number > 1:
+        if number <= 10:
+            return None  # a 5- or a 10-point scale? let the re-ask settle it
+        number /= 100  # a percentage without the sign
+    if not 0.0 <= number <= 1.0:
+        return None
+    return round(number, 3)
+
+
+def coerce_bool(value: Any) -> Optional[bool]:
+    """Whole-word reading of yes/no answers ("normally edible", "not edible", "Yes"); None when mixed."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    if not isinstance(value, str):
+        return None
+    words = re.findall(r"[a-z]+", value.lower())
+    if not words:
+        return None
+    if words[0] in _YES:
+        return True
+    if words[0] in _NO:
+        return False
+    negated = {i + 1 for i, word in enumerate(words) if word in _NEGATIVE}
+    positive = any(word in _POSITIVE and i not in negated for i, word in enumerate(words))
+    negative = any(word in _NEGATIVE for word in words)
+    if positive and not negative:
+        return True
+    if negative and not positive:
+        return False
+    return None
+
+
+def repair_schema(text: str) -> SchemaResult:
+    """Parse a schema response once, coercing what can be fixed locally and listing what is missing."""
+    obj, repaired = _loads_lenient(text or "")
+    if obj is None:
+        return SchemaResult({}, list(REQUIRED_FIELDS), True)
+
+    fields: Dict[str, Any] = {}
+    for key in TEXT_FIELDS:
+        value = obj.get(key)
+        if isinstance(value, list):
+            value, repaired = ", ".join(str(v) for v in value), True
+        elif value is not None and not isinstance(value, str):
+            value, repaired = str(value), True
+        if value and value.strip():
+            fields[key] = value.strip()
+
+    raw_rating = obj.get("health_safety_rating")
+    rating = coerce_rating(raw_rating)
+    if rating is not None:
+        fields["health_safety_rating"] = rating
+        repaired = repaired or rating != raw_rating
+
+    raw_edible = obj.get("edible")
+    edible = coerce_bool(raw_edible)
+    if edible is not None:
+        fields["edible"] = edible
+        repaired = repaired or edible is not raw_edible
+
+    missing = [f for f in REQUIRED_FIELDS if f not in fields]
+    return SchemaResult(fields, missing, repaired)
+
+
+# ---------------------------------------------------------------------
+# COUNTERS
+# ---------------------------------------------------------------------
+
+
+class SchemaStats:
+    """How schema responses were resolved: clean, locally repaired, re-asked, or failed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.clean = 0
+        self.repaired = 0
+        self.reasked = 0
+        self.failed = 0
+
+    def record(self, result: SchemaResult, reasked: bool) -> None:
+        with self._lock:
+            self.responses += 1
+            if result.missing:
+                self.failed += 1
+            elif result.repaired:
+                self.repaired += 1
+            else:
+                self.clean += 1
+            if reasked:
+                self.reasked += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.responses or 1
+            return {
+                "responses": self.responses,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "reasked": self.reasked,
+                "failed": self.failed,
+                "repair_rate": round(self.repaired / total, 3),
+                "reask_rate": round(self.reasked / total, 3),
+            }
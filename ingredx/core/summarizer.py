@@ -1,17 +1,71 @@
 from __future__ import annotations
+import hashlib
+import json
+import random
+import re
+import threading
+import time
 from typing import Protocol
 
+from .deadline import call_timeout
+
 
 class Summarizer(Protocol):
-    def summarize(self, prompt: str) -> str: # returns text in the desired language
+    def summarize(self, prompt: str, force_json: bool = False) -> str: # returns text in the desired language
         ...
 
 
 class StubSummarizer:
-    """Deterministic fallback (for tests / no-network)."""
-    def summarize(self, prompt: str) -> str:
+    """
+    Deterministic fallback (for tests / no-network / benchmarks).
+
+    `latency` (seconds) and `failure_rate` (0–1) simulate a slow or flaky
+    backend; `calls` and `failures` count requests so harnesses can report
+    LLM calls per label. Like the OpenAI adapter, a call gives up (with an
+    error reply) once the current deadline's call timeout runs out.
+    """
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def summarize(self, prompt: str, force_json: bool = False) -> str:
+        timeout = call_timeout(None, "summarizer call")
+        with self._lock:
+            self.calls += 1
+            failed = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+
+        if self.latency > 0:
+            if timeout is not None and timeout < self.latency:
+                time.sleep(timeout)
+                return "[Error: Request timed out.]"
+            time.sleep(self.latency)
+        if failed:
+            # same shape as OpenAISummarizer, which reports API errors as text
+            return "[Error: Simulated summarizer failure]"
+
+        if force_json:
+            # Stable per-ingredient rating so repeated schema calls agree with each other
+            quoted = re.search(r"'([^']+)'", prompt)
+            key = quoted.group(1).lower() if quoted else prompt
+            digest = hashlib.sha1(key.encode("utf-8")).digest()
+            rating = round(digest[0] / 255, 2)
+            return json.dumps({
+                "chemical_properties": "Placeholder chemical properties.",
+                "common_uses": "Placeholder common uses.",
+                "safety_and_controversy": "Placeholder safety notes.",
+                "environmental_and_regulation": "Placeholder regulatory notes.",
+                "health_safety_rating": rating,
+                "edible": rating >= 0.5,
+            })
+
         # Super simple heuristic: return last lines as a stub.
         return (
             "This is a placeholder explanation. The real system will use an LLM to "
             "generate a layperson-friendly summary based on the provided data."
-        )
\ No newline at end of file
+        )
@@ -1,6 +1,11 @@
 # ingredx/core/translator.py
 from __future__ import annotations
-from typing import Protocol
+import hashlib
+import threading
+import time
+from typing import Dict, List, MutableMapping, Optional, Protocol
+
+from .cache import MemoryCache, RatingCache
 
 
 class Translator(Protocol):
@@ -12,14 +17,125 @@ class Translator(Protocol):
     def detect_language(self, text: str) -> str:
         ...
 
+    # Optional batch API: implementations without it are called once per string
+    def translate_many(self, texts: List[str], target_language: str) -> List[str]:
+        ...
+
 
 class IdentityTranslator:
     """No-op translator for tests or English-only pipelines."""
 
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # simulated per-call delay (seconds)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _tick(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
     def translate(self, text: str, target_language: str) -> str:
         # Just return text unchanged
+        self._tick()
         return text
 
+    def translate_many(self, texts: List[str], target_language: str) -> List[str]:
+        self._tick()
+        return list(texts)
+
     def detect_language(self, text: str) -> str:
         # Always assume English
+        self._tick()
         return "en"
+
+
+class CachingTranslator:
+    """
+    Wraps any Translator with a translation memory keyed by
+    (target language, sha1 of source text), persisted through a RatingCache
+    backend as {"<language>:<digest>": translated_text}. Each new translation
+    is written as its own entry (put() when the backend has it), and the
+    backend is re-read before lookups, so workers sharing one file see each
+    other's translations instead of overwriting them.
+    Error strings from the adapters are never memorized.
+    """
+
+    def __init__(self, inner: Translator, store: Optional[RatingCache] = None):
+        self.inner = inner
+        self.store = store if store is not None else MemoryCache()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _lookup(memory: MutableMapping, target_language: str, key: str) -> Optional[str]:
+        found = memory.get(f"{target_language}:{key}")
+        if found is None:
+            # files written before per-entry writes nest by language
+            table = memory.get(target_language)
+            found = table.get(key) if isinstance(table, dict) else None
+        return found
+
+    def detect_language(self, text: str) -> str:
+        return self.inner.detect_language(text)
+
+    def translate(self, text: str, target_language: str) -> str:
+        return self.translate_many([text], target_language)[0]
+
+    def translate_many(self, texts: List[str], target_language: str) -> List[str]:
+        """
+        Serve what the memory already knows; send each distinct new string to the
+        inner translator once, in a single batch when it supports translate_many.
+        """
+        results: List[Optional[str]] = list(texts)
+        pending: Dict[str, List[int]] = {}  # digest -> positions waiting on it
+        new_texts: List[str] = []
+
+        with self._lock:
+            memory = self.store.load()  # picks up what other workers wrote meanwhile
+            for i, text in enumerate(texts):
+                if not text or not text.strip():
+                    continue
+                key = self._digest(text)
+                found = self._lookup(memory, target_language, key)
+                if found is not None:
+                    self.hits += 1
+                    results[i] = found
+                    continue
+                if key not in pending:
+                    self.misses += 1
+                    pending[key] = []
+                    new_texts.append(text)
+                pending[key].append(i)
+
+        if not new_texts:
+            return results
+
+        batch = getattr(self.inner, "translate_many", None)
+        if batch is not None:
+            translated = batch(new_texts, target_language)
+        else:
+            translated = [self.inner.translate(text, target_language) for text in new_texts]
+
+        with self._lock:
+            put = getattr(self.store, "put", None)
+            memory = self.store.load() if put is None else None
+            for text, out in zip(new_texts, translated):
+                key = self._digest(text)
+                for i in pending[key]:
+                    results[i] = out
+                if out.startswith("[Error"):
+                    continue
+                if put is not None:
+                    put(f"{target_language}:{key}", out)
+                else:
+                    memory[f"{target_language}:{key}"] = out
+            if memory is not None:
+                self.store.save(memory)
+        return results
@@ -1,14 +1,42 @@
 from __future__ import annotations
-from typing import Optional, Dict, List
-from dotenv import load_dotenv
-import os
+from typing import Optional, Dict, List, MutableMapping, Tuple, TYPE_CHECKING
+import contextvars
 import json
+import os
 import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .core.prompts import DISCLAIMER, PromptStats, RenderedPrompt, rating_line, render
+from .core.schema import REQUIRED_FIELDS, TEXT_FIELDS, SchemaResult, SchemaStats, repair_schema
+from .core.breaker import CircuitBreaker, CircuitOpenError, GuardedSummarizer, GuardedTranslator
+from .core.cache import JsonFileCache, RatingCache
+from .core.deadline import DeadlineExceeded, check_deadline, current_deadline, deadline_expired, use_deadline
+from .core.summarizer import Summarizer
+from .core.translator import CachingTranslator, Translator
+
+if TYPE_CHECKING:
+    from .core.answer_cache import AnswerCache
+    from .core.models import IngredientAnalysis, IngredientRecord, IngredientSchema
+    from .knowledge_base import KnowledgeBase
+    from .matcher import Matcher
+
+# Cache entries hold the schema fields plus private, underscore-prefixed extras
+BLURB_KEY = "_blurb"
+
+# Separates a chat answer from its suggested follow-up questions
+FOLLOW_UPS = "\n\n💡 Suggested follow-ups:\n"
+CHAT_UNAVAILABLE = "The assistant is temporarily unavailable. Please try again in a minute."
+# Conversations kept by id (least recently used dropped first)
+MAX_CONVERSATIONS = 1024
+
 
-from .core.models import Explanation, IngredientAnalysis
-from .core.prompts import DISCLAIMER
-from .adapters.openai_translator import OpenAITranslator
-from .adapters.openai_summarizer import OpenAISummarizer
+def _public_schema(entry: Dict) -> Dict:
+    """Strip private cache fields before a schema leaves the engine."""
+    return {k: v for k, v in entry.items() if not k.startswith("_")}
 
 
 class IngredientEngine:
@@ -16,71 +44,192 @@ class IngredientEngine:
     AI-only ingredient engine with strict, persistent safety rating consistency,
     a memory-aware conversational chatbot mode with suggested questions,
     🆕 and an en-masse ingredients list analyzer for OCR label parsing.
+
+    Blurbs and schemas are generated once in English under the canonical
+    ingredient name; other languages are served by translating that cached
+    English text through a per-language translation memory.
+
+    Every backend is pluggable. Omitted summarizer/translator default to the
+    OpenAI adapters, which only build their (shared) client on first use, so
+    stub/offline engines never touch the network stack. The default rating
+    cache is held as a CompactTable (array columns + compressed text).
     """
 
-    def __init__(self, cache_file: str = "ingredx_cache.json"):
-        load_dotenv()
-        self.summarizer = OpenAISummarizer()
-        self.translator = OpenAITranslator()
+    def __init__(
+        self,
+        cache_file: str = "ingredx_cache.json",
+        summarizer: Optional[Summarizer] = None,
+        translator: Optional[Translator] = None,
+        cache: Optional[RatingCache] = None,
+        kb: Optional["KnowledgeBase"] = None,
+        matcher: Optional["Matcher"] = None,
+        translation_cache: Optional[RatingCache] = None,
+        answer_cache: Optional["AnswerCache"] = None,
+        llm_breaker: Optional[CircuitBreaker] = None,
+        translation_breaker: Optional[CircuitBreaker] = None,
+    ):
+        if summarizer is None:
+            from .adapters.openai_summarizer import OpenAISummarizer
+            summarizer = OpenAISummarizer()
+        if translator is None:
+            from .adapters.openai_translator import OpenAITranslator
+            translator = OpenAITranslator()
+        self.summarizer = summarizer
+        self.translator = translator
+        self.kb = kb
+        self.matcher = matcher
         self.cache_file = cache_file
-        self._memory: Dict[str, Dict[str, float]] = self._load_cache()
-        self.chat_history: List[Dict[str, str]] = []  # 🧠 conversation memory
+        self.cache = cache if cache is not None else JsonFileCache(cache_file, compact=True)
+        if translation_cache is None and cache is None:
+            root, ext = os.path.splitext(cache_file)
+            translation_cache = JsonFileCache(f"{root}_translations{ext or '.json'}")
+        # Backend calls go through circuit breakers; while one is open the engine
+        # answers from the cache / KB right away and flags the output as degraded
+        self.llm_breaker = llm_breaker or CircuitBreaker(
+            "summarizer", probe=lambda: not summarizer.summarize("Reply with OK.").startswith("[Error")
+        )
+        self.translation_breaker = translation_breaker or CircuitBreaker(
+            "translator", probe=lambda: not translator.translate("OK", "es").startswith("[Error")
+        )
+        self._llm = GuardedSummarizer(summarizer, self.llm_breaker)
+        self.translations = CachingTranslator(GuardedTranslator(translator, self.translation_breaker), translation_cache)
+        self._cache_lock = threading.RLock()  # guards load-modify-save of the rating cache
+        self._memory: MutableMapping[str, Dict] = self._load_cache()
+        self.chat_history: List[Dict[str, str]] = []  # 🧠 conversation memory (default conversation)
+        self._conversations: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self._conversations_lock = threading.Lock()
+        self._answer_cache = answer_cache
+        self.prompt_stats = PromptStats()
+        self.schema_stats = SchemaStats()
+
+    @property
+    def degraded(self) -> bool:
+        """True while any backend circuit is open."""
+        return self.llm_breaker.is_open or self.translation_breaker.is_open
+
+    @property
+    def answer_cache(self) -> "AnswerCache":
+        """Paraphrase-aware chat answer cache (NumPy-backed, so built on first chat)."""
+        if self._answer_cache is None:
+            from .core.answer_cache import AnswerCache
+            self._answer_cache = AnswerCache()
+        return self._answer_cache
 
     # ---------- Persistent cache helpers ----------
-    def _load_cache(self) -> Dict[str, Dict[str, float]]:
-        """Load the safety rating cache from disk."""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+    def _load_cache(self) -> MutableMapping[str, Dict]:
+        """Load the safety rating cache from the cache backend."""
+        return self.cache.load()
 
     def _save_cache(self) -> None:
-        """Save the safety rating cache to disk."""
-        try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self._memory, f, indent=2)
-        except Exception:
-            pass
+        """Save the safety rating cache to the cache backend."""
+        self.cache.save(self._memory)
+
+    def _cache_entry(self, name_key: str) -> Dict:
+        """Reload the cache and return a copy of one entry (empty if unknown)."""
+        with self._cache_lock:
+            self._memory = self._load_cache()
+            return dict(self._memory.get(name_key, {}))
+
+    def _update_cache_entry(self, name_key: str, fields: Dict) -> None:
+        """Merge fields into an entry against the latest cache so concurrent writers don't clobber each other."""
+        with self._cache_lock:
+            self._memory = self._load_cache()
+            entry = {**self._memory.get(name_key, {}), **fields}
+            put = getattr(self.cache, "put", None)
+            if put is not None:
+                put(name_key, entry)  # one journal line instead of rewriting every entry
+                self._memory = self._load_cache()
+            else:
+                self._memory[name_key] = entry
+                self._save_cache()
+
+    def _cache_key(self, ingredient_name: str):
+        """(cache key, KB match, KB record); KB synonyms share one cache entry."""
+        name_key = ingredient_name.lower().strip()
+        match = self.matcher.match(ingredient_name) if self.matcher else None
+        record = self.kb.get(match.matched_id) if (self.kb and match) else None
+        if match and match.matched_name:
+            name_key = match.matched_name.lower().strip()
+        return name_key, match, record
+
+    def canonical_name(self, ingredient_name: str) -> str:
+        """The English cache key an ingredient name resolves to (KB synonyms collapse to one name)."""
+        return self._cache_key(ingredient_name)[0]
 
     # ---------- Main generation entry ----------
-    def generate(self, ingredient_name: str, mode: str = "overview", output_language: str = "en"):
+    def generate(
+        self,
+        ingredient_name: str,
+        mode: str = "overview",
+        output_language: str = "en",
+        source_language: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> "IngredientAnalysis":
         """
         Generate a short blurb, detailed overview, structured JSON schema, or chatbot reply.
+        `source_language` is the language of `ingredient_name` when known (e.g. detected
+        from a label); non-English names are canonicalized to English before cache lookup.
+        Chat turns go to the conversation `conversation_id` (see new_conversation()),
+        or to the engine's default conversation when it is None.
         """
-        name_key = ingredient_name.lower().strip()
-
-        # reload cache each time
-        self._memory = self._load_cache()
-
-        known_rating = None
-        if name_key in self._memory:
-            known_rating = self._memory[name_key].get("health_safety_rating")
-
-        prompt = self._build_generation_prompt(
-            ingredient_name,
-            mode=mode,
-            language=output_language,
-            known_rating=known_rating,
-        )
-
-        # schema mode = force JSON
-        force_json = (mode == "schema")
-        text_output = self.summarizer.summarize(prompt, force_json=force_json)
+        # pydantic is the heaviest import in the package; defer it to the first call
+        from .core.models import Explanation, IngredientAnalysis
+
+        degraded = False
+        translated_name = None
+        if source_language and source_language != "en" and mode != "chat":
+            (translated_name,), degraded = self._translate_many([ingredient_name], "en")
+            translated_name = translated_name.strip()
+        canonical_name = translated_name or ingredient_name
+
+        # Resolve against the local KB when one is plugged in, then reload the cache entry
+        name_key, match, record = self._cache_key(canonical_name)
+        entry = self._cache_entry(name_key)
+        known_rating = entry.get("health_safety_rating")
+
+        # blurb/schema live in the canonical English cache; translate on the way out
+        canonical = mode in ("blurb", "schema")
+        generation_language = "en" if canonical else output_language
+
+        text_output = None
+        structured = None
+        if mode == "blurb" and entry.get(BLURB_KEY):
+            text_output = entry[BLURB_KEY]
+        elif mode == "schema" and all(field in entry for field in REQUIRED_FIELDS):
+            structured = self._validate_schema(_public_schema(entry))
+        from_cache = text_output is not None or structured is not None
+
+        # chat builds its own prompts below
+        if not from_cache and mode != "chat":
+            prompt = self._build_generation_prompt(
+                canonical_name,
+                mode=mode,
+                language=generation_language,
+                known_rating=known_rating,
+            )
 
-        # save rating if schema mode
-        if mode == "schema":
             try:
-                parsed = json.loads(text_output)
-                rating = float(parsed.get("health_safety_rating"))
-                if 0 <= rating <= 1:
-                    self._memory[name_key] = parsed
-                    self._save_cache()
-                    known_rating = rating
-            except Exception:
-                pass
+                # schema mode = force JSON, validated and saved with its rating
+                if mode == "schema":
+                    structured, text_output = self._generate_schema(prompt, canonical_name, known_rating)
+                    if structured is not None:
+                        self._update_cache_entry(name_key, structured.model_dump(exclude_none=True))
+                        known_rating = structured.health_safety_rating
+                else:
+                    text_output = self._summarize(prompt)
+                    if mode == "blurb" and not text_output.startswith("[Error"):
+                        self._update_cache_entry(name_key, {BLURB_KEY: text_output})
+            except CircuitOpenError:
+                degraded = True
+                structured = None
+                text_output = self._fallback_output(mode, canonical_name, record, entry)
+
+        if structured is not None:
+            text_output = json.dumps(structured.model_dump(exclude_none=True), ensure_ascii=False)
+
+        if canonical and output_language != "en":
+            text_output, localize_degraded = self._localize(text_output, mode, output_language)
+            degraded = degraded or localize_degraded
 
         # include rating only in overview text
         if known_rating is not None and mode == "overview":
@@ -88,34 +237,159 @@ class IngredientEngine:
 
         # ---------- Chat mode special handling ----------
         if mode == "chat":
-            self.chat_history.append({"role": "user", "content": ingredient_name})
-            chat_prompt = self._build_chat_prompt(language=output_language)
-            text_output = self.summarizer.summarize(chat_prompt, force_json=False)
-            self.chat_history.append({"role": "assistant", "content": text_output})
-
-            suggestion_prompt = (
-                "Based on this conversation, suggest 3-5 natural, concise follow-up questions "
-                "the user might ask next about ingredients, safety, or nutrition. "
-                "Return ONLY a numbered list and no other comments."
-            )
-            suggestions = self.summarizer.summarize(suggestion_prompt, force_json=False)
-            text_output = f"{text_output.strip()}\n\n💡 Suggested follow-ups:\n{suggestions.strip()}"
+            # Only a conversation's opening question may reuse (or seed) a cached answer:
+            # later turns are answered with the earlier ones in the prompt, and follow-ups
+            # ("What about for kids?") need not say what they refer to
+            history, known = self._conversation(conversation_id)
+            reusable = known and not history
+            hit = self.answer_cache.lookup(ingredient_name, output_language) if reusable else None
+            history.append({"role": "user", "content": ingredient_name})
+
+            if hit is not None:
+                text_output = hit.answer
+                from_cache = True
+                history.append({"role": "assistant", "content": text_output.split(FOLLOW_UPS)[0]})
+            else:
+                answer = None
+                try:
+                    chat_prompt = self._build_chat_prompt(language=output_language, history=history)
+                    answer = self._summarize(chat_prompt)
+                    history.append({"role": "assistant", "content": answer})
+
+                    suggestions = self._summarize(render("suggestions", history=self._chat_context(2, history)))
+                    text_output = f"{answer.strip()}{FOLLOW_UPS}{suggestions.strip()}"
+                    if reusable and not (answer.startswith("[Error") or suggestions.startswith("[Error")):
+                        self.answer_cache.store(ingredient_name, text_output, output_language)
+                except CircuitOpenError:
+                    degraded = True
+                    if answer is None:
+                        text_output = CHAT_UNAVAILABLE
+                        history.pop()  # keep the unanswered question out of the context
+                    else:
+                        text_output = answer.strip()
+                except DeadlineExceeded:
+                    if answer is None:
+                        history.pop()
+                        raise
+                    text_output = answer.strip()  # out of time for follow-ups; the answer stands
 
         explanation = Explanation(
             detail_level=mode,
             language=output_language,
             text=text_output,
+            cached=from_cache,
+            degraded=degraded,
         )
 
         return IngredientAnalysis(
             ingredient_input=ingredient_name,
-            translated_name=None,
-            match=None,
-            data=None,
+            translated_name=translated_name,
+            match=match,
+            data=record,
+            structured=structured,
             explanation=explanation,
             disclaimer=DISCLAIMER,
         )
 
+    # ---------- Schema validation ----------
+    def _generate_schema(
+        self,
+        prompt: RenderedPrompt,
+        ingredient_name: str,
+        known_rating: Optional[float],
+    ) -> Tuple[Optional["IngredientSchema"], str]:
+        """
+        One schema call, parsed once with local repair; fields that are still missing
+        get a single targeted re-ask instead of a full regeneration.
+        Returns (IngredientSchema or None, raw response text).
+        """
+        raw = self._summarize(prompt, force_json=True)
+        result = repair_schema(raw)
+        if "health_safety_rating" in result.missing and known_rating is not None:
+            result = result.merge(SchemaResult({"health_safety_rating": known_rating}, [], True))
+
+        reasked = False
+        if result.missing and not raw.startswith("[Error"):
+            reasked = True
+            follow_up = render(
+                "schema_fields",
+                name=ingredient_name,
+                fields=", ".join(result.missing),
+                rating_line=rating_line(known_rating),
+            )
+            result = result.merge(repair_schema(self._summarize(follow_up, force_json=True)))
+
+        # Rating and edibility are what must be right; blank prose is better than another call
+        if result.missing and set(result.missing) <= set(TEXT_FIELDS):
+            result = result.merge(SchemaResult({f: "" for f in result.missing}, [], True))
+
+        self.schema_stats.record(result, reasked)
+        if result.missing:
+            return None, raw
+        return self._validate_schema(result.fields), raw
+
+    @staticmethod
+    def _validate_schema(fields: Dict) -> Optional["IngredientSchema"]:
+        from pydantic import ValidationError
+        from .core.models import IngredientSchema
+
+        try:
+            return IngredientSchema.model_validate(fields)
+        except ValidationError:
+            return None
+
+    def _translate_many(self, texts: List[str], language: str) -> Tuple[List[str], bool]:
+        """
+        Translate through the translation memory. When the translator is down (circuit
+        open, or the call itself raised) return the input untranslated, flagged degraded.
+        """
+        try:
+            return self.translations.translate_many(texts, language), False
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            return list(texts), True
+
+    def _localize(self, text: str, mode: str, language: str) -> Tuple[str, bool]:
+        """Translate canonical English output; schema keeps its keys and numeric fields. Returns (text, degraded)."""
+        if mode == "schema":
+            try:
+                parsed = json.loads(text)
+            except Exception:
+                parsed = None
+            if isinstance(parsed, dict):
+                degraded = self._localize_outputs({}, {"": parsed}, language)
+                return json.dumps(parsed, ensure_ascii=False), degraded
+        (translated,), degraded = self._translate_many([text], language)
+        return translated, degraded
+
+    def _localize_outputs(self, blurbs: Dict[str, str], schemas: Dict[str, Dict], language: str) -> bool:
+        """Translate blurbs and schema text fields in place with one batched call; returns True if degraded."""
+        slots = [(blurbs, ing) for ing, text in blurbs.items() if not text.startswith("[Error")]
+        for schema in schemas.values():
+            slots.extend((schema, field) for field in TEXT_FIELDS if isinstance(schema.get(field), str))
+        if not slots:
+            return False
+        translated, degraded = self._translate_many([holder[key] for holder, key in slots], language)
+        for (holder, key), text in zip(slots, translated):
+            holder[key] = text
+        return degraded
+
+    def _fallback_output(self, mode: str, name: str, record: Optional["IngredientRecord"], entry: Dict) -> str:
+        """What can be said without the LLM: cached fields and local KB data."""
+        if mode == "schema":
+            fields = _public_schema(entry)
+            if "health_safety_rating" not in fields and record is not None and record.safety_score is not None:
+                fields["health_safety_rating"] = round(record.safety_score / 100, 2)
+            return json.dumps(fields, ensure_ascii=False)
+        if record is None:
+            return f"Detailed information about {name} is temporarily unavailable."
+        text = f"{record.name.capitalize()}"
+        text += f" is commonly used for {', '.join(record.common_uses)}." if record.common_uses else " is a known ingredient."
+        if record.warnings:
+            text += f" Notes: {'; '.join(record.warnings)}."
+        return text
+
     # ---------- Prompt builders ----------
     def _build_generation_prompt(
         self,
@@ -123,80 +397,73 @@ class IngredientEngine:
         mode: str,
         language: str,
         known_rating: Optional[float] = None,
-    ) -> str:
-        """Build LLM prompts for non-chat modes."""
-        rating_hint = (
-            f"The ingredient '{ingredient_name}' already has an established health safety rating of "
-            f"{known_rating:.2f} on a scale of 0–1. You must use this exact value consistently.\n\n"
-            if known_rating is not None else ""
+    ) -> RenderedPrompt:
+        """Build LLM prompts for non-chat modes (static instructions first, ingredient data last)."""
+        if mode == "chat":
+            return self._build_chat_prompt(language)
+        return render(
+            mode,
+            name=ingredient_name,
+            language=language,
+            rating_line=rating_line(known_rating),
         )
 
-        if mode == "blurb":
-            return (
-                f"You are a chemistry explainer. Write a MAX 2-sentence, layperson-friendly summary "
-                f"of '{ingredient_name}', focusing only on what it is, what it does, and any general safety "
-                f"considerations. Do NOT mention or reference any numeric ratings, decimals, or scores. "
-                f"Avoid jargon and keep it friendly.\n\nWrite in {language}."
-            )
+    # ---------- Conversations ----------
+    def new_conversation(self) -> str:
+        """Start an empty conversation and return its id for later chat turns."""
+        conversation_id = uuid.uuid4().hex
+        with self._conversations_lock:
+            self._add_conversation(conversation_id)
+        return conversation_id
 
-        elif mode == "overview":
-            return (
-                f"{rating_hint}"
-                f"You are an expert chemist writing a scientifically grounded overview "
-                f"for laypeople about '{ingredient_name}'. Include:\n"
-                f"1) Common synonyms/other names\n"
-                f"2) Chemical properties and function\n"
-                f"3) Common uses\n"
-                f"4) Safety and controversy information\n"
-                f"5) Environmental and regulatory considerations\n"
-                f"6) Overall decimal health-safety rating (0–1)\n"
-                f"7) Binary yes/no edible status\n\n"
-                f"Use the same rating if known.\nWrite clearly in {language}."
-            )
-
-        elif mode == "schema":
-            return (
-                f"{rating_hint}"
-                f"You are an expert data annotator. Produce a JSON object (strict JSON format only) for '{ingredient_name}'. "
-                f"The response must be a valid JSON object and nothing else.\n"
-                "Generate the following fields exactly:\n"
-                "{\n"
-                '  "chemical_properties": "description of physical and chemical characteristics",\n'
-                '  "common_uses": "typical applications and industries where it is used",\n'
-                '  "safety_and_controversy": "known toxicology, debates, or usage restrictions",\n'
-                '  "environmental_and_regulation": "ecological effects and global regulatory status",\n'
-                '  "health_safety_rating": "decimal between 0 and 1",\n'
-                '  "edible": "true or false"\n'
-                "}\n\n"
-                "If a health safety rating is already established, use the same number.\n"
-                "Return ONLY valid JSON with no commentary, explanation, or markdown."
-            )
-
-        elif mode == "chat":
-            return self._build_chat_prompt(language)
-
-        else:
-            raise ValueError(f"Unknown mode '{mode}'")
+    def _conversation(self, conversation_id: Optional[str]) -> Tuple[List[Dict[str, str]], bool]:
+        """
+        (history, known) for a conversation id. An id that is not (or no longer) known
+        gets a fresh history but known=False: its turn continues a conversation we have
+        forgotten, so it must not be treated as an opening question.
+        """
+        if conversation_id is None:
+            return self.chat_history, True
+        with self._conversations_lock:
+            history = self._conversations.get(conversation_id)
+            if history is not None:
+                self._conversations.move_to_end(conversation_id)
+                return history, True
+            return self._add_conversation(conversation_id), False
+
+    def _add_conversation(self, conversation_id: str) -> List[Dict[str, str]]:
+        # caller holds _conversations_lock
+        history: List[Dict[str, str]] = []
+        self._conversations[conversation_id] = history
+        while len(self._conversations) > MAX_CONVERSATIONS:
+            self._conversations.popitem(last=False)
+        return history
 
     # ---------- Chat prompt builder ----------
-    def _build_chat_prompt(self, language: str) -> str:
+    def _build_chat_prompt(self, language: str, history: Optional[List[Dict[str, str]]] = None) -> RenderedPrompt:
         """Constructs a context-rich chat prompt including memory."""
-        context_snippets = "\n".join(
-            f"{msg['role'].capitalize()}: {msg['content']}" for msg in self.chat_history[-8:]
-        )
-        return (
-            f"You are a friendly, scientifically accurate nutrition and chemistry assistant specializing "
-            f"in ingredients, their chemical properties, uses, safety, and environmental effects.\n\n"
-            f"Conversation so far:\n{context_snippets}\n\n"
-            f"Continue the conversation naturally, focusing on things like:\n"
-            f"Chemical Properties and Function\n"
-            f"Common Uses\n"
-            f"Safety and Controversy\n"
-            f"Environmental and Regulatory Considerations\n\n"
-            f"or other fun facts!\n\n"
-            f"Be conversational but precise. Write in {language}."
+        return render("chat", history=self._chat_context(8, history), language=language)
+
+    def _chat_context(self, turns: int, history: Optional[List[Dict[str, str]]] = None) -> str:
+        history = self.chat_history if history is None else history
+        return "\n".join(
+            f"{msg['role'].capitalize()}: {msg['content']}" for msg in history[-turns:]
         )
 
+    def _summarize(self, prompt: RenderedPrompt, force_json: bool = False) -> str:
+        """
+        Send a rendered prompt to the summarizer, recording its token accounting.
+        Every LLM call is a deadline checkpoint; an error reply from a call the
+        deadline cut short surfaces as DeadlineExceeded, not as content.
+        """
+        check_deadline(f"{prompt.template} call")
+        if not self.llm_breaker.is_open:  # calls that fail fast never reach the backend
+            self.prompt_stats.record(prompt)
+        text = self._llm.summarize(prompt.text, force_json=force_json)
+        if text.startswith("[Error"):
+            check_deadline(f"{prompt.template} reply")
+        return text
+
     # ----------------------------------------------------------------------
     # 🆕 INGREDIENT LIST EXTRACTION + BATCH ANALYSIS
     # ----------------------------------------------------------------------
@@ -225,7 +492,7 @@ class IngredientEngine:
 
         # ---------- 1️⃣ Fuzzy match for 'ingredients' section ----------
         match = re.search(
-            r"ingr[eai]{0,2}d[iy]?e?n?t?s?\s*[:\-–_—]*\s*(.*)",
+            r"ingr[eaié]{0,2}d[iy]?e?n?t?(?:e?s)?\s*[:\-–_—]*\s*(.*)",
             text,
             re.IGNORECASE | re.DOTALL,
         )
@@ -261,7 +528,7 @@ class IngredientEngine:
         # ---------- 3️⃣ Normalize delimiters (handle missing spaces) ----------
         section = re.sub(r"([;,/\.])(?=[A-Za-z])", r"\1 ", section)
         section = section.replace(";", ",").replace("/", ",").replace(".", ",")
-        section = re.sub(r"[^a-zA-Z0-9(),.\s-]", " ", section)
+        section = re.sub(r"[^\w(),.\s-]|_", " ", section)  # \w keeps accented letters
         section = re.sub(r"\s{2,}", " ", section).strip()
 
         # ---------- 4️⃣ Split and clean ----------
@@ -295,34 +562,268 @@ class IngredientEngine:
     def analyze_ingredient_list(self, raw_text: str, language: str = "en") -> Dict[str, Dict]:
         """
         🧩 Extracts all ingredients from messy label text and analyzes them in bulk.
+        The label language is detected once; `language="auto"` answers in it.
         Returns:
         {
           "ingredients": [...],
           "blurbs": {...},
-          "schemas": {...}
+          "schemas": {...},
+          "language": "en",
+          "source_language": "es",
+          "canonical": {ingredient: English cache key}
         }
         """
-        ingredients = self.extract_ingredients_from_text(raw_text)
-        if not ingredients:
-            return {"error": "No ingredient list found."}
+        return self.analyze_labels([raw_text], language=language)["labels"][0]
 
-        blurbs = {}
-        schemas = {}
+    def analyze_labels(self, raw_texts: List[str], language: str = "en", max_workers: int = 8) -> Dict:
+        """
+        📦 Analyzes a batch of label texts at once.
+        Ingredients are unioned across the batch and each distinct one is resolved
+        once (cache first, misses concurrently), then fanned back out per label.
+        Returns {"labels": [per-label result as in analyze_ingredient_list], "stats": {...}}.
+        """
+        labels: List[Dict] = []
+        for raw_text in raw_texts:
+            ingredients = self.extract_ingredients_from_text(raw_text)
+            if not ingredients:
+                labels.append({"error": "No ingredient list found."})
+                continue
+            source_language = self.translations.detect_language(raw_text)
+            labels.append({
+                "ingredients": ingredients,
+                "blurbs": {},
+                "schemas": {},
+                "language": source_language if language == "auto" else language,
+                "source_language": source_language,
+                "canonical": {},
+                "degraded": False,
+            })
+        parsed = [label for label in labels if "error" not in label]
+
+        # One batched call per source language canonicalizes names to their English cache keys
+        by_source: Dict[str, Dict[str, None]] = {}
+        for label in parsed:
+            if label["source_language"] != "en":
+                by_source.setdefault(label["source_language"], {}).update(dict.fromkeys(label["ingredients"]))
+        check_deadline("ingredient canonicalization")
+        canonical: Dict[Tuple[str, str], str] = {}
+        untranslated = set()  # source languages whose names could not be canonicalized
+        for source_language, names in by_source.items():
+            names = list(names)
+            english, degraded = self._translate_many(names, "en")
+            if degraded:
+                untranslated.add(source_language)
+            for name, english_name in zip(names, english):
+                canonical[(source_language, name)] = english_name.strip()
+
+        def english_name(label: Dict, ing: str) -> str:
+            return canonical.get((label["source_language"], ing), ing).strip()
+
+        unique = self._unique_names(english_name(label, ing) for label in parsed for ing in label["ingredients"])
+        results, timing = self._resolve_ingredients(unique, max_workers)
+
+        # Localize each distinct ingredient once per output language
+        needed: Dict[str, Dict[str, None]] = {}
+        for label in parsed:
+            if label["language"] != "en":
+                needed.setdefault(label["language"], {}).update(
+                    (english_name(label, ing).lower(), None) for ing in label["ingredients"]
+                )
+        localized = {"en": results}
+        if needed:
+            check_deadline("localization")
+        for target, keys in needed.items():
+            localized[target] = self._localize_results({key: results[key] for key in keys}, target)
+
+        for label in parsed:
+            table = localized[label["language"]]
+            blurbs, schemas, keys = {}, {}, {}
+            for ing in label["ingredients"]:
+                result = table[english_name(label, ing).lower()]
+                keys[ing] = result["key"]
+                label["degraded"] = label["degraded"] or result.get("degraded", False)
+                if "error" in result:
+                    blurbs[ing] = f"[Error: {result['error']}]"
+                    schemas[ing] = {}
+                else:
+                    blurbs[ing] = result["blurb"]
+                    schemas[ing] = result["schema"]
+            label["blurbs"] = blurbs
+            label["schemas"] = schemas
+            label["canonical"] = keys
+            label["degraded"] = label["degraded"] or label["source_language"] in untranslated
 
-        for ing in ingredients:
-            try:
-                blurb = self.generate(ing, mode="blurb", output_language=language)
-                schema = self.generate(ing, mode="schema", output_language=language)
-                blurbs[ing] = blurb.explanation.text
-                schemas[ing] = json.loads(schema.explanation.text)
-            except Exception as e:
-                blurbs[ing] = f"[Error: {e}]"
-                schemas[ing] = {}
+        return {
+            "labels": labels,
+            "stats": {
+                "labels": len(labels),
+                "ingredient_mentions": sum(len(label["ingredients"]) for label in parsed),
+                "unique_ingredients": len(unique),
+                "degraded": any(label["degraded"] for label in parsed),
+                **timing,
+            },
+        }
+
+    # ----------------------------------------------------------------------
+    # 🧵 SHARED BULK RESOLUTION
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _unique_names(names) -> List[str]:
+        """Case-insensitive dedupe, keeping the first spelling and input order."""
+        unique = []
+        seen = set()
+        for name in names:
+            name = name.strip()
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                unique.append(name)
+        return unique
+
+    def _resolve_one(self, ingredient_name: str) -> Dict:
+        """
+        English blurb + validated schema for one ingredient, or {"error": ...}.
+        With the LLM circuit open the schema is whatever the cache / KB holds and
+        the result is marked degraded.
+        """
+        key = self.canonical_name(ingredient_name)
+        try:
+            blurb = self.generate(ingredient_name, mode="blurb", output_language="en")
+            schema = self.generate(ingredient_name, mode="schema", output_language="en")
+            degraded = blurb.explanation.degraded or schema.explanation.degraded
+            if schema.structured is not None:
+                fields = schema.structured.model_dump(exclude_none=True)
+            elif schema.explanation.degraded:
+                fields = json.loads(schema.explanation.text)
+            else:
+                raise ValueError("Schema output could not be validated")
+            return {
+                "name": ingredient_name,
+                "key": key,
+                "blurb": blurb.explanation.text,
+                "schema": fields,
+                "degraded": degraded,
+            }
+        except Exception as e:
+            return {"name": ingredient_name, "key": key, "error": str(e)}
+
+    def _resolve_ingredients(self, names: List[str], max_workers: int = 8) -> Tuple[Dict[str, Dict], Dict]:
+        """
+        Resolve distinct ingredient names in English: cached ones inline, the rest
+        on a thread pool. Results are keyed by lower-cased name and carry a
+        "source" of "cache" or "generated".
+        """
+        started = time.perf_counter()
+        results: Dict[str, Dict] = {}
+        misses = []
+        for name in names:
+            if self.is_cached(name):
+                results[name.lower()] = {**self._resolve_one(name), "source": "cache"}
+            else:
+                misses.append(name)
+        cached_done = time.perf_counter()
+
+        if misses:
+            check_deadline("ingredient generation")
+            pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(misses))))
+            # Workers run in a copy of this context under the request deadline, uncapped:
+            # they start nothing once it has passed, but a call in flight runs on the
+            # adapter's own timeout, so it can finish after the request gave up on it
+            deadline = current_deadline()
+            fill_deadline = deadline.uncapped() if deadline is not None else None
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._resolve_under, fill_deadline, name)
+                for name in misses
+            ]
+            pending = self._wait(futures)
+            # Never block on stragglers: calls in flight finish in the background and
+            # still fill the cache, queued ones are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+            if pending:
+                check_deadline("ingredient generation")
+            for name, future in zip(misses, futures):
+                results[name.lower()] = {**future.result(), "source": "generated"}
+        finished = time.perf_counter()
+
+        return results, {
+            "total_ms": round((finished - started) * 1000, 2),
+            "cached_ms": round((cached_done - started) * 1000, 2),
+            "generated_ms": round((finished - cached_done) * 1000, 2),
+            "cached": len(names) - len(misses),
+            "generated": len(misses),
+        }
+
+    def _resolve_under(self, deadline, ingredient_name: str) -> Dict:
+        with use_deadline(deadline):
+            return self._resolve_one(ingredient_name)
+
+    @staticmethod
+    def _wait(futures) -> set:
+        """Wait for futures until all are done or the request deadline passes / is cancelled; returns the pending ones."""
+        deadline = current_deadline()
+        if deadline is None:
+            return wait(futures).not_done
+        pending = set(futures)
+        while pending and not deadline_expired():
+            # short slices so a cancelled request stops waiting promptly
+            _, pending = wait(pending, timeout=min(deadline.remaining() or 0.25, 0.25))
+        return pending
+
+    def _localize_results(self, results: Dict[str, Dict], language: str) -> Dict[str, Dict]:
+        """Translated copies of resolved results, all text in one batched call."""
+        ok = {key: result for key, result in results.items() if "error" not in result}
+        blurbs = {key: result["blurb"] for key, result in ok.items()}
+        schemas = {key: dict(result["schema"]) for key, result in ok.items()}
+        degraded = self._localize_outputs(blurbs, schemas, language)
+        return {
+            key: {
+                **result,
+                "blurb": blurbs[key],
+                "schema": schemas[key],
+                "degraded": result["degraded"] or degraded,
+            } if key in ok else result
+            for key, result in results.items()
+        }
+
+    # ----------------------------------------------------------------------
+    # 🆕 N-WAY COMPARISON
+    # ----------------------------------------------------------------------
+
+    COMPARE_FIELDS = ("health_safety_rating", "edible", "common_uses", "safety_and_controversy")
+
+    def is_cached(self, ingredient_name: str) -> bool:
+        """True when blurb and schema for this ingredient can be served without an LLM call."""
+        entry = self._cache_entry(self._cache_key(ingredient_name)[0])
+        return bool(entry.get(BLURB_KEY)) and all(field in entry for field in REQUIRED_FIELDS)
+
+    def compare_ingredients(self, names: List[str], language: str = "en", max_workers: int = 8) -> Dict:
+        """
+        ⚖️ Side-by-side comparison of any number of ingredients.
+        Cached ingredients are resolved inline; the rest are generated concurrently.
+        Returns {"ingredients": [row, ...], "timing": {...}} with rows in input order.
+        """
+        unique = self._unique_names(names)
+        results, timing = self._resolve_ingredients(unique, max_workers)
+        if language != "en":
+            results = self._localize_results(results, language)
+
+        rows = []
+        for name in unique:
+            result = results[name.lower()]
+            row = {"ingredient": name}
+            if "error" in result:
+                row["error"] = result["error"]
+            else:
+                row.update({field: result["schema"].get(field) for field in self.COMPARE_FIELDS})
+                row["blurb"] = result["blurb"]
+                row["degraded"] = result["degraded"]
+            row["source"] = result["source"]
+            rows.append(row)
 
         return {
-            "ingredients": ingredients,
-            "blurbs": blurbs,
-            "schemas": schemas,
+            "ingredients": rows,
+            "degraded": any(row.get("degraded") for row in rows),
+            "timing": timing,
         }
 
 
@@ -0,0 +1,28 @@
+# ingredx/knowledge_base.py
+from __future__ import annotations
+import json
+import os
+from typing import Dict, List, Optional
+
+from .core.models import IngredientRecord, KnowledgeBaseConfig
+
+
+class KnowledgeBase:
+    """
+    Local, read-only ingredient records loaded from a JSON list.
+    A missing file yields an empty KB so the CLI still works without sample data.
+    """
+
+    def __init__(self, config: KnowledgeBaseConfig):
+        self.config = config
+        self.records: List[IngredientRecord] = []
+        if os.path.exists(config.json_path):
+            with open(config.json_path, "r", encoding="utf-8") as f:
+                self.records = [IngredientRecord(**row) for row in json.load(f)]
+        self._by_id: Dict[str, IngredientRecord] = {r.id: r for r in self.records}
+
+    def get(self, record_id: Optional[str]) -> Optional[IngredientRecord]:
+        return self._by_id.get(record_id) if record_id else None
+
+    def __len__(self) -> int:
+        return len(self.records)
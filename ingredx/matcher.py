@@ -0,0 +1,46 @@
+# ingredx/matcher.py
+from __future__ import annotations
+import difflib
+import re
+from typing import Dict
+
+from .core.models import MatchResult
+from .knowledge_base import KnowledgeBase
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s-]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class Matcher:
+    """Resolves free-text ingredient names to KB records by name, synonym, then fuzzy match."""
+
+    def __init__(self, kb: KnowledgeBase, cutoff: float = 0.85):
+        self.kb = kb
+        self.cutoff = cutoff
+        self._index: Dict[str, str] = {}
+        for rec in kb.records:
+            for alias in [rec.name, *rec.synonyms]:
+                self._index.setdefault(normalize(alias), rec.id)
+
+    def match(self, text: str) -> MatchResult:
+        normalized = normalize(text)
+        matched_id = self._index.get(normalized)
+        confidence = 1.0 if matched_id else 0.0
+
+        if matched_id is None and self._index:
+            close = difflib.get_close_matches(normalized, self._index.keys(), n=1, cutoff=self.cutoff)
+            if close:
+                matched_id = self._index[close[0]]
+                confidence = difflib.SequenceMatcher(None, normalized, close[0]).ratio()
+
+        rec = self.kb.get(matched_id)
+        return MatchResult(
+            input_text=text,
+            normalized=normalized,
+            matched_id=matched_id,
+            matched_name=rec.name if rec else None,
+            match_confidence=round(confidence, 3),
+        )
@@ -0,0 +1,521 @@
+# ingredx/scan_store.py
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: folds are not fenced against other processes' appends
+    fcntl = None
+
+# Score fields a ranking can order by
+SCORE_FIELDS = ("min", "weighted_mean", "below_threshold")
+
+# below_threshold columns are kept for this many distinct thresholds (LRU)
+MAX_THRESHOLDS = 4
+
+
+class _IntVector:
+    """Growable int32 array; slices handed out stay valid while it keeps growing."""
+
+    __slots__ = ("_buf", "size")
+
+    def __init__(self, capacity: int = 4, dtype=np.int32):
+        self._buf = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self._buf.dtype)
+        end = self.size + len(values)
+        if end > len(self._buf):
+            grown = np.empty(max(end, 2 * len(self._buf)), dtype=self._buf.dtype)
+            grown[:self.size] = self._buf[:self.size]
+            self._buf = grown
+        self._buf[self.size:end] = values
+        self.size = end
+
+    def append(self, value) -> None:
+        self.extend((value,))
+
+    def view(self) -> np.ndarray:
+        return self._buf[:self.size]
+
+
+class ScanStore:
+    """
+    Persisted record of analyzed labels with an inverted index from canonical
+    ingredient to the scans containing it.
+
+    Products, ingredients and scans are interned to dense integer ids. Each
+    scan's ingredients are kept in one CSR layout (offsets + ingredient ids, in
+    label order), postings are sorted int32 arrays of scan ids, and ratings are
+    a float32 column indexed by ingredient id (NaN when unknown). Re-scanning a
+    product supersedes its previous scan. Label scores are computed for every
+    scan at once with NumPy segment reductions and kept up to date as scans
+    arrive; a rating change rescores only the scans containing that ingredient.
+
+    On disk the store is an .npz snapshot plus a journal of the scans added
+    since (`<path>.<generation>.log`, one JSON line per scan). add() appends a
+    line, and every call first applies the lines other processes appended, so
+    several processes can share one store. Every `fold_every` journal lines a
+    background thread folds the journal into a new snapshot and starts the next
+    generation's journal; save() does the same on demand.
+    """
+
+    def __init__(self, path: Optional[str] = "ingredx_scans.npz", fold_every: int = 10_000):
+        self.path = path
+        self.fold_every = fold_every
+        self._lock = threading.RLock()  # in-process state; taken after the file fence, never before
+        self._folding = False
+        self._reset()
+        if path:
+            with self._lock:
+                self._catch_up()
+
+    def _reset(self) -> None:
+        self._ingredient_ids: Dict[str, int] = {}
+        self._ingredients: List[str] = []
+        self._product_ids: Dict[str, int] = {}
+        self._products: List[str] = []
+        self._latest = _IntVector()  # product id -> its live scan id
+
+        self._offsets = _IntVector(dtype=np.int64)
+        self._offsets.append(0)
+        self._terms = _IntVector()  # ingredient ids, scan after scan
+        self._scan_product = _IntVector()
+        self._ratings = _IntVector(dtype=np.float32)
+        self._postings: List[_IntVector] = []
+
+        self._gen: Optional[int] = None  # journal generation we follow (None: nothing read yet)
+        self._stamp: Optional[Tuple[int, int]] = None  # the snapshot as we last read / wrote it
+        self._log_offset = 0  # bytes of this generation's journal already applied
+        self._log_lines = 0
+        self._scores: Dict[str, np.ndarray] = {}  # threshold-free score columns, per scan
+        self._below: "OrderedDict[float, np.ndarray]" = OrderedDict()  # threshold -> below_threshold column
+
+    # ---------- Ingest ----------
+    def _ingredient_id(self, name: str) -> int:
+        key = name.lower().strip()
+        ingredient_id = self._ingredient_ids.get(key)
+        if ingredient_id is None:
+            ingredient_id = len(self._ingredients)
+            self._ingredient_ids[key] = ingredient_id
+            self._ingredients.append(key)
+            self._ratings.append(np.nan)
+            self._postings.append(_IntVector())
+        return ingredient_id
+
+    def add(
+        self,
+        ingredients: Sequence[str],
+        ratings: Optional[Sequence[Optional[float]]] = None,
+        product: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """
+        Record one analyzed label: canonical ingredient names in label order and,
+        optionally, their health_safety_rating. Returns {"scan_id", "product"}.
+        """
+        if not any(name.strip() for name in ingredients):
+            raise ValueError("A scan needs at least one ingredient")
+        if not self.path:
+            with self._lock:
+                return self._result(self._apply(ingredients, ratings, product))
+
+        line = (json.dumps(
+            {"i": list(ingredients), "r": None if ratings is None else list(ratings), "p": product},
+            ensure_ascii=False,
+        ) + "\n").encode("utf-8")
+        scan_id = None
+        try:
+            with self._fence(shared=True), self._lock:
+                self._catch_up()  # also settles which generation's journal is current
+                fd = os.open(self._log_path(self._gen), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)  # one O_APPEND write, so lines from other processes never interleave
+                    end = os.lseek(fd, 0, os.SEEK_CUR)
+                finally:
+                    os.close(fd)
+                scan_id = self._catch_up(own=end - len(line))  # applies ours in file order
+        except OSError:
+            pass
+        with self._lock:
+            if scan_id is None:  # unwritable location: keep it for this process
+                scan_id = self._apply(ingredients, ratings, product)
+            if self._log_lines >= self.fold_every and not self._folding:
+                self._folding = True
+                threading.Thread(target=self._fold_in_background, name="scan-store-fold", daemon=True).start()
+            return self._result(scan_id)
+
+    def _result(self, scan_id: int) -> Dict[str, object]:
+        return {"scan_id": scan_id, "product": self._products[int(self._scan_product.view()[scan_id])]}
+
+    def _apply(
+        self,
+        ingredients: Sequence[str],
+        ratings: Optional[Sequence[Optional[float]]],
+        product: Optional[str],
+    ) -> int:
+        terms = list(dict.fromkeys(self._ingredient_id(name) for name in ingredients if name.strip()))
+        if not terms:
+            raise ValueError("A scan needs at least one ingredient")
+        for name, rating in zip(ingredients, ratings or ()):
+            if rating is not None and name.strip():
+                self._set_rating(self._ingredient_ids[name.lower().strip()], rating)
+        return self._append(terms, product)[0]
+
+    def _set_rating(self, ingredient_id: int, rating: float) -> None:
+        column = self._ratings.view()
+        if column[ingredient_id] == np.float32(rating):  # NaN never compares equal
+            return
+        column[ingredient_id] = rating
+        # Only labels containing the ingredient move: rescore just those rows
+        scans = self._postings[ingredient_id].view()
+        if self._scores:
+            rows = scans[scans < len(self._scores["min"])]
+            for field, values in self._segment_scores(*self._segments(rows)).items():
+                self._scores[field][rows] = values
+        for threshold, below in self._below.items():
+            rows = scans[scans < len(below)]
+            below[rows] = self._segment_below(*self._segments(rows), threshold)
+
+    def _append(self, terms: List[int], product: Optional[str]) -> Tuple[int, str]:
+        scan_id = self._scan_product.size
+        if product is None:
+            product = f"scan-{scan_id}"
+        product_id = self._product_ids.get(product)
+        if product_id is None:
+            product_id = len(self._products)
+            self._product_ids[product] = product_id
+            self._products.append(product)
+            self._latest.append(scan_id)
+        else:
+            self._latest.view()[product_id] = scan_id
+
+        self._terms.extend(terms)
+        self._offsets.append(self._terms.size)
+        self._scan_product.append(product_id)
+        for term in terms:
+            self._postings[term].append(scan_id)  # scan ids only grow, so postings stay sorted
+        return scan_id, product
+
+    # ---------- Queries ----------
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._products)
+
+    def _live(self) -> np.ndarray:
+        live = np.zeros(self._scan_product.size, dtype=bool)
+        live[self._latest.view()] = True
+        return live
+
+    def products_with(self, ingredients: Sequence[str], exclude: Sequence[str] = (), limit: int = 100) -> Dict:
+        """Products whose latest scan contains every ingredient in `ingredients` and none in `exclude`."""
+        with self._lock:
+            self._refresh()
+            postings = []
+            for name in ingredients:
+                ingredient_id = self._ingredient_ids.get(name.lower().strip())
+                if ingredient_id is None:
+                    return {"total": 0, "products": []}
+                postings.append(self._postings[ingredient_id].view())
+            if not postings:
+                return {"total": 0, "products": []}
+
+            postings.sort(key=len)  # intersect from the rarest ingredient up
+            scans = postings[0]
+            for other in postings[1:]:
+                scans = np.intersect1d(scans, other, assume_unique=True)
+            for name in exclude:
+                ingredient_id = self._ingredient_ids.get(name.lower().strip())
+                if ingredient_id is not None:
+                    scans = np.setdiff1d(scans, self._postings[ingredient_id].view(), assume_unique=True)
+            scans = scans[self._live()[scans]]
+            products = self._scan_product.view()[scans[:limit]]
+            return {"total": int(len(scans)), "products": [self._products[p] for p in products]}
+
+    def _segments(self, scans: Optional[np.ndarray] = None, first: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """(ingredient ids, per-scan counts) of `scans` back to back, or of every scan from `first` on."""
+        offsets = self._offsets.view()
+        if scans is None:
+            offsets = offsets[first:]
+            return self._terms.view()[offsets[0]:offsets[-1]], np.diff(offsets)
+        starts = offsets[scans]
+        counts = offsets[scans + 1] - starts
+        index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return self._terms.view()[index], counts
+
+    def _segment_scores(self, terms: np.ndarray, counts: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-scan min, position-weighted mean and counts for scans laid out by _segments()."""
+        starts = np.cumsum(counts) - counts
+        ratings = self._ratings.view()[terms]
+        known = ~np.isnan(ratings)
+        # Labels list ingredients by descending quantity, so earlier ones weigh more
+        weights = 1.0 / (np.arange(len(terms)) - np.repeat(starts, counts) + 1)
+        weights = np.where(known, weights, 0.0)
+        filled = np.where(known, ratings, 0.0)
+
+        if len(terms):
+            lowest = np.minimum.reduceat(np.where(known, ratings, np.inf), starts)
+            weight_sum = np.add.reduceat(weights, starts)
+            weighted = np.add.reduceat(weights * filled, starts)
+            rated = np.add.reduceat(known.astype(np.int32), starts)
+        else:
+            lowest = weight_sum = weighted = rated = np.zeros(0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "min": np.where(np.isinf(lowest), np.nan, lowest),
+                "weighted_mean": np.where(weight_sum > 0, weighted / weight_sum, np.nan),
+                "ingredients": counts.astype(np.int32),
+                "rated": rated.astype(np.int32),
+            }
+
+    def _segment_below(self, terms: np.ndarray, counts: np.ndarray, threshold: float) -> np.ndarray:
+        """Per-scan count of rated ingredients below `threshold` for scans laid out by _segments()."""
+        if not len(terms):
+            return np.zeros(len(counts), dtype=np.int32)
+        below = self._ratings.view()[terms] < threshold  # NaN compares False
+        return np.add.reduceat(below.astype(np.int32), np.cumsum(counts) - counts).astype(np.int32)
+
+    def _score_columns(self, threshold: float) -> Dict[str, np.ndarray]:
+        """
+        Score columns for every scan. New scans are scored incrementally (a
+        rating change already rescored the rows it moved); below_threshold is
+        kept for the last MAX_THRESHOLDS thresholds asked for.
+        """
+        scans = self._scan_product.size
+        done = len(self._scores["min"]) if self._scores else 0
+        if done < scans:
+            tail = self._segment_scores(*self._segments(first=done))
+            self._scores = tail if not done else {k: np.concatenate((self._scores[k], tail[k])) for k in tail}
+
+        below = self._below.pop(threshold, None)
+        done = 0 if below is None else len(below)
+        if done < scans:
+            tail = self._segment_below(*self._segments(first=done), threshold)
+            below = tail if not done else np.concatenate((below, tail))
+        self._below[threshold] = below
+        while len(self._below) > MAX_THRESHOLDS:
+            self._below.popitem(last=False)
+        return {**self._scores, "below_threshold": below}
+
+    def _score_row(self, scan_id: int, columns: Dict[str, np.ndarray]) -> Dict[str, object]:
+        def number(value):
+            return None if np.isnan(value) else round(float(value), 3)
+
+        return {
+            "product": self._products[int(self._scan_product.view()[scan_id])],
+            "scan_id": int(scan_id),
+            "min": number(columns["min"][scan_id]),
+            "weighted_mean": number(columns["weighted_mean"][scan_id]),
+            "below_threshold": int(columns["below_threshold"][scan_id]),
+            "ingredients": int(columns["ingredients"][scan_id]),
+            "rated": int(columns["rated"][scan_id]),
+        }
+
+    def score(self, product: str, threshold: float = 0.4) -> Optional[Dict[str, object]]:
+        """Label-level score for a product's latest scan, or None when it was never scanned."""
+        with self._lock:
+            self._refresh()
+            product_id = self._product_ids.get(product)
+            if product_id is None:
+                return None
+            scan_id = int(self._latest.view()[product_id])
+            row = self._score_row(scan_id, self._score_columns(threshold))
+            start, end = self._offsets.view()[scan_id:scan_id + 2]
+            row["ingredient_names"] = [self._ingredients[t] for t in self._terms.view()[start:end]]
+            return row
+
+    def rank(
+        self,
+        by: str = "weighted_mean",
+        worst_first: bool = True,
+        limit: int = 20,
+        threshold: float = 0.4,
+        ingredients: Sequence[str] = (),
+    ) -> List[Dict[str, object]]:
+        """Products ordered by a score field; optionally only those containing `ingredients`."""
+        if by not in SCORE_FIELDS:
+            raise ValueError(f"Unknown score field '{by}' (expected one of {', '.join(SCORE_FIELDS)})")
+        with self._lock:
+            self._refresh()
+            columns = self._score_columns(threshold)
+            if ingredients:
+                scans = []
+                for name in ingredients:
+                    ingredient_id = self._ingredient_ids.get(name.lower().strip())
+                    if ingredient_id is None:
+                        return []
+                    scans.append(self._postings[ingredient_id].view())
+                candidates = scans[0]
+                for other in scans[1:]:
+                    candidates = np.intersect1d(candidates, other, assume_unique=True)
+                candidates = candidates[self._live()[candidates]]
+            else:
+                candidates = self._latest.view().copy()
+
+            values = columns[by][candidates].astype(np.float64)
+            # "worst" is low ratings but many below-threshold ingredients
+            key = values if (by == "below_threshold") != worst_first else -values
+            key = np.where(np.isnan(key), np.inf, key)  # unrated labels go last
+            if len(key) > limit:
+                top = np.argpartition(key, limit)[:limit]
+                top = top[np.argsort(key[top], kind="stable")]
+            else:
+                top = np.argsort(key, kind="stable")
+            return [self._score_row(candidates[i], columns) for i in top]
+
+    # ---------- Persistence ----------
+    def _log_path(self, gen: int) -> str:
+        return f"{self.path}.{gen}.log"
+
+    @contextmanager
+    def _fence(self, shared: bool) -> Iterator[None]:
+        """Cross-process lock: journal appends share it, folding the journal is exclusive."""
+        with open(f"{self.path}.lock", "a") as fence:
+            if fcntl is not None:
+                fcntl.flock(fence, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield  # released when the file closes
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self) -> None:
+        if self.path:
+            self._catch_up()
+
+    def _catch_up(self, own: Optional[int] = None) -> Optional[int]:
+        """
+        Apply what other processes wrote since we last looked (caller holds _lock).
+        A snapshot one generation ahead is adopted without reloading: it holds
+        exactly the journal we already follow, which is read to its end first.
+        Only a process further behind reloads the snapshot. Returns the scan id
+        of the journal line starting at byte `own`, when given.
+        """
+        stamp = self._file_stamp()
+        if self._gen is None or stamp != self._stamp:
+            gen = self._snapshot_gen() if stamp is not None else 0
+            if self._gen is not None and gen == self._gen + 1 and (
+                not self._log_offset or os.path.exists(self._log_path(self._gen))
+            ):
+                self._replay()
+                self._gen, self._stamp, self._log_offset, self._log_lines = gen, stamp, 0, 0
+            elif self._gen is None or gen != self._gen:
+                self._reset()
+                if stamp is not None:
+                    self._load(self.path)
+                else:
+                    self._gen = 0
+            else:
+                self._stamp = stamp
+        return self._replay(own)
+
+    def _replay(self, own: Optional[int] = None) -> Optional[int]:
+        """Apply journal lines written since the last read, in file order."""
+        try:
+            with open(self._log_path(self._gen), "rb") as f:
+                f.seek(self._log_offset)
+                chunk = f.read()
+        except OSError:
+            return None
+        complete = chunk.rfind(b"\n") + 1  # a writer may be mid-line; leave that for next time
+        found = None
+        position = self._log_offset
+        for line in chunk[:complete].splitlines(keepends=True):
+            try:
+                record = json.loads(line)
+                scan_id = self._apply(record["i"], record.get("r"), record.get("p"))
+            except Exception:
+                scan_id = None
+            if position == own:
+                found = scan_id
+            position += len(line)
+            self._log_lines += 1
+        self._log_offset += complete
+        return found
+
+    def _snapshot_gen(self) -> int:
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                return int(data["log_gen"]) if "log_gen" in data.files else 0
+        except Exception:
+            return -1  # unreadable right now: forces a reload attempt
+
+    def save(self) -> None:
+        """
+        Fold the journal into a new snapshot (an .npz archive of the flat arrays)
+        and start the next journal generation. Appends from every process wait
+        for the write; queries here keep being answered from memory meanwhile.
+        """
+        if not self.path:
+            return
+        with self._fence(shared=False):
+            with self._lock:
+                self._catch_up()
+                if not self._log_lines and (self._stamp is not None or not self._scan_product.size):
+                    return  # the snapshot already holds everything
+                gen = self._gen
+                # no scan can arrive while the fence is held, so these stay as captured
+                arrays = {
+                    "ingredients": np.array(self._ingredients, dtype=str),
+                    "products": np.array(self._products, dtype=str),
+                    "latest": self._latest.view().copy(),
+                    "offsets": self._offsets.view(),
+                    "terms": self._terms.view(),
+                    "scan_product": self._scan_product.view(),
+                    "ratings": self._ratings.view().copy(),
+                    "log_gen": np.int64(gen + 1),
+                }
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(tmp, **arrays)
+            os.replace(tmp, self.path)
+            with self._lock:
+                self._gen, self._stamp, self._log_offset, self._log_lines = gen + 1, self._file_stamp(), 0, 0
+            try:
+                os.remove(self._log_path(gen - 1))  # anyone still on it reloads the snapshot
+            except OSError:
+                pass
+
+    def _fold_in_background(self) -> None:
+        try:
+            self.save()
+        except Exception as e:
+            print(f"⚠️  Scan store fold failed: {e}")
+        finally:
+            self._folding = False
+
+    def _load(self, path: str) -> None:
+        self._stamp = self._file_stamp()
+        with np.load(path, allow_pickle=False) as data:
+            self._ingredients = [str(s) for s in data["ingredients"]]
+            self._products = [str(s) for s in data["products"]]
+            self._ingredient_ids = {name: i for i, name in enumerate(self._ingredients)}
+            self._product_ids = {name: i for i, name in enumerate(self._products)}
+            for attr in ("latest", "offsets", "terms", "scan_product", "ratings"):
+                vector = getattr(self, f"_{attr}")
+                vector.size = 0
+                vector.extend(data[attr])
+            self._gen = int(data["log_gen"]) if "log_gen" in data.files else 0
+
+        # Rebuild postings from the CSR arrays: group scan ids by ingredient id
+        offsets = self._offsets.view()
+        terms = self._terms.view()
+        scan_of = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        order = np.argsort(terms, kind="stable")
+        bounds = np.searchsorted(terms[order], np.arange(len(self._ingredients) + 1))
+        self._postings = []
+        for i in range(len(self._ingredients)):
+            vector = _IntVector(capacity=max(4, bounds[i + 1] - bounds[i]))
+            vector.extend(scan_of[order[bounds[i]:bounds[i + 1]]])
+            self._postings.append(vector)
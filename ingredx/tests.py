@@ -1,12 +1,16 @@
 # tests/test_engine.py
-from ingredx.models import KnowledgeBaseConfig
+import json
+
+from ingredx.core.models import KnowledgeBaseConfig
+from ingredx.core.cache import MemoryCache
 from ingredx.knowledge_base import KnowledgeBase
 from ingredx.matcher import Matcher
 from ingredx.engine import IngredientEngine
 from ingredx.core.summarizer import StubSummarizer
 from ingredx.core.translator import IdentityTranslator
 
-def test_basic_analysis(tmp_path):
+
+def _engine(tmp_path, **kwargs):
     # tiny KB
     kb_json = tmp_path / "kb.json"
     kb_json.write_text(
@@ -16,9 +20,490 @@ def test_basic_analysis(tmp_path):
         encoding="utf-8",
     )
     kb = KnowledgeBase(KnowledgeBaseConfig(json_path=str(kb_json)))
-    engine = IngredientEngine(kb, Matcher(kb), StubSummarizer(), IdentityTranslator())
+    kwargs.setdefault("summarizer", StubSummarizer())
+    kwargs.setdefault("translator", IdentityTranslator())
+    kwargs.setdefault("cache", MemoryCache())
+    return IngredientEngine(kb=kb, matcher=Matcher(kb), **kwargs)
+
 
-    result = engine.analyze_ingredient("Salt", detail="short", output_language="en")
+def test_basic_analysis(tmp_path):
+    engine = _engine(tmp_path)
+
+    result = engine.generate("Salt", mode="blurb", output_language="en")
     assert result.match.matched_id == "ing_1"
+    assert result.data.name == "sodium chloride"
     assert result.explanation.text.startswith("This is a placeholder")
     assert result.disclaimer
+
+
+def test_schema_rating_is_cached_under_canonical_name(tmp_path):
+    cache = MemoryCache()
+    engine = _engine(tmp_path, cache=cache)
+
+    result = engine.generate("Salt", mode="schema")
+    rating = json.loads(result.explanation.text)["health_safety_rating"]
+    assert cache.data["sodium chloride"]["health_safety_rating"] == rating
+
+
+def test_default_adapters_do_not_build_clients(tmp_path):
+    engine = IngredientEngine(cache=MemoryCache())
+    assert engine.summarizer._client is None
+    assert engine.translator._client is None
+
+
+def test_engine_import_stays_off_heavy_dependencies():
+    from ingredx.bench_imports import HEAVY, measure
+
+    _, loaded = measure("ingredx.engine")
+    assert not set(HEAVY) & loaded
+
+
+class _SpanishTranslator:
+    """Tiny dictionary translator that counts real translation calls."""
+
+    WORDS = {"azúcar": "sugar", "sal": "salt"}
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect_language(self, text):
+        return "es"
+
+    def translate(self, text, target_language):
+        self.calls += 1
+        if target_language == "en":
+            return self.WORDS.get(text.lower(), text)
+        return f"[{target_language}] {text}"
+
+
+def test_non_english_label_reuses_canonical_english_cache(tmp_path):
+    cache = MemoryCache()
+    summarizer = StubSummarizer()
+    english = _engine(tmp_path, cache=cache, summarizer=summarizer)
+    english.generate("Sugar", mode="blurb")
+    english.generate("Sugar", mode="schema")
+    calls_before = summarizer.calls
+
+    translator = _SpanishTranslator()
+    spanish = _engine(tmp_path, cache=cache, summarizer=summarizer, translator=translator)
+    results = spanish.analyze_ingredient_list("Ingredientes: azúcar", language="auto")
+
+    assert results["ingredients"] == ["Azúcar"]
+    assert results["source_language"] == "es"
+    assert summarizer.calls == calls_before  # served from the English cache
+    assert results["blurbs"]["Azúcar"].startswith("[es] ")
+    assert isinstance(results["schemas"]["Azúcar"]["health_safety_rating"], float)
+
+    # second scan hits the translation memory for names and output text
+    translator.calls = 0
+    spanish.analyze_ingredient_list("Ingredientes: azúcar", language="auto")
+    assert translator.calls == 0
+
+
+def test_local_language_detection():
+    from ingredx.core.langid import NgramLanguageDetector
+
+    detect = NgramLanguageDetector().detect
+    assert detect("Ingredients: water, sugar, wheat flour, salt. Contains milk.") == "en"
+    assert detect("Ingredientes: agua, azúcar, harina de trigo, sal. Contiene leche.") == "es"
+    assert detect("Zutaten: Weizenmehl, Zucker, Butter, Eier, Salz.") == "de"
+    assert detect("Состав: мука, сахар, соль") == "ru"
+    # plain English labels of ingredient names, and an English header on an accent-stripped OCR read
+    assert detect("Ingredients: milk, cream, cultures, enzymes") == "en"
+    assert detect("Ingredients: sodium chloride, potassium iodide, dextrose") == "en"
+    assert detect("Maltodextrin, carrageenan, soy lecithin, natural flavors") == "en"
+    assert detect("Ingredients: lait, sucre, farine de ble, sel, huile vegetale") == "fr"
+    assert detect("Ingredientes: leite, açúcar, sal, óleo") == "pt"
+
+
+def test_translate_many_batches_only_new_strings(tmp_path):
+    from ingredx.core.cache import JsonFileCache
+    from ingredx.core.translator import CachingTranslator
+
+    class Batching:
+        def __init__(self):
+            self.batches = []
+
+        def translate_many(self, texts, target_language):
+            self.batches.append(list(texts))
+            return [t.upper() for t in texts]
+
+    inner = Batching()
+    memory = CachingTranslator(inner, MemoryCache())
+    assert memory.translate_many(["a", "b", "a"], "fr") == ["A", "B", "A"]
+    assert memory.translate_many(["b", "c"], "fr") == ["B", "C"]
+    assert inner.batches == [["a", "b"], ["c"]]
+    assert memory.hits == 1
+
+    # workers sharing one file add to each other's memory instead of overwriting it
+    path = str(tmp_path / "translations.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fr": {CachingTranslator._digest("salt"): "sel"}}, f)  # older nested layout
+    worker_a, worker_b = CachingTranslator(inner, JsonFileCache(path)), CachingTranslator(inner, JsonFileCache(path))
+    assert worker_a.translate_many(["sugar", "salt"], "fr") == ["SUGAR", "sel"]
+    assert worker_b.translate_many(["sugar", "vinegar"], "fr") == ["SUGAR", "VINEGAR"]
+    fresh = CachingTranslator(inner, JsonFileCache(path))
+    assert fresh.translate_many(["sugar", "vinegar", "salt"], "fr") == ["SUGAR", "VINEGAR", "sel"]
+    assert inner.batches[2:] == [["sugar"], ["vinegar"]]
+
+
+def test_prompts_share_static_prefix(tmp_path):
+    from ingredx.core.prompts import render
+
+    sugar = render("schema", name="Sugar", rating_line="")
+    salt = render("schema", name="Salt", rating_line="Established rating: 0.90\n")
+    assert sugar.prefix == salt.prefix
+    assert "Salt" not in salt.prefix and salt.text.endswith(salt.payload)
+
+    engine = _engine(tmp_path)
+    engine.generate("Sugar", mode="blurb")
+    engine.generate("Salt", mode="blurb")
+    stats = engine.prompt_stats.snapshot()
+    assert stats["calls"] == 2
+    assert 0 < stats["prefix_cache_eligible_share"] < stats["static_prefix_share"] < 1
+
+
+def test_schema_repair_coerces_locally():
+    from ingredx.core.schema import repair_schema
+
+    result = repair_schema(
+        "Here you go:\n```json\n{'chemical_properties': 'x', 'common_uses': 'y', "
+        "'safety_and_controversy': 'z', 'environmental_and_regulation': 'w', "
+        "'health_safety_rating': 'about 8/10', 'edible': 'Yes',}\n```"
+    )
+    assert result.missing == []
+    assert result.repaired
+    assert result.fields["health_safety_rating"] == 0.8
+    assert result.fields["edible"] is True
+
+
+def test_schema_repair_reads_scales_and_words_exactly():
+    from ingredx.core.schema import coerce_bool, coerce_rating
+
+    assert [coerce_rating(v) for v in ("3/5", "4 out of 5", "1.5/2", "80%", 80, 0.25)] == [0.6, 0.8, 0.75, 0.8, 0.8, 0.25]
+    # a bare 7 may be out of 5 or 10; ranges and nonsense are left for the re-ask
+    assert [coerce_rating(v) for v in (7, "7", "0.7-0.8", "-0.2", "n/a")] == [None] * 5
+    assert [coerce_bool(v) for v in ("normally edible", "Yes", "not edible", "non-edible", "nothing")] == [
+        True, True, False, False, None,
+    ]
+
+
+def test_schema_missing_fields_are_reasked_once(tmp_path):
+    class Scripted:
+        def __init__(self, replies):
+            self.replies = list(replies)
+            self.prompts = []
+
+        def summarize(self, prompt, force_json=False):
+            self.prompts.append(prompt)
+            return self.replies.pop(0)
+
+    summarizer = Scripted([
+        '{"chemical_properties": "x", "common_uses": "y", "safety_and_controversy": "z", '
+        '"environmental_and_regulation": "w", "edible": "no"}',
+        '{"health_safety_rating": "0.3"}',
+    ])
+    cache = MemoryCache()
+    engine = _engine(tmp_path, summarizer=summarizer, cache=cache)
+
+    result = engine.generate("Sugar", mode="schema")
+    assert result.structured.health_safety_rating == 0.3
+    assert result.structured.edible is False
+    assert "Missing fields: health_safety_rating" in summarizer.prompts[1]
+    assert engine.schema_stats.snapshot()["reasked"] == 1
+
+    # valid entry is cached, so the next scan costs nothing
+    engine.generate("Sugar", mode="schema")
+    assert len(summarizer.prompts) == 2
+
+
+def test_compare_is_cache_first_and_concurrent(tmp_path):
+    summarizer = StubSummarizer()
+    engine = _engine(tmp_path, summarizer=summarizer)
+
+    first = engine.compare_ingredients(["Sugar", "Salt", "Aspartame", "sugar"])
+    assert [row["ingredient"] for row in first["ingredients"]] == ["Sugar", "Salt", "Aspartame"]
+    assert first["timing"]["generated"] == 3
+    assert all(isinstance(row["health_safety_rating"], float) for row in first["ingredients"])
+    calls = summarizer.calls
+
+    second = engine.compare_ingredients(["Sugar", "Salt", "Aspartame", "Yeast Extract"])
+    assert second["timing"]["cached"] == 3
+    assert [row["source"] for row in second["ingredients"]] == ["cache", "cache", "cache", "generated"]
+    assert summarizer.calls == calls + 2  # only the new ingredient's blurb + schema
+
+
+def test_label_batch_analyzes_each_distinct_ingredient_once(tmp_path):
+    summarizer = StubSummarizer()
+    engine = _engine(tmp_path, summarizer=summarizer)
+    texts = [
+        "Ingredients: sugar, salt, citric acid.",
+        "Ingredients: Salt, Sugar, yeast extract.",
+        "Best before 2025",
+        "Ingredients: citric acid, sugar.",
+    ]
+
+    batch = engine.analyze_labels(texts)
+    assert batch["stats"]["unique_ingredients"] == 4
+    assert summarizer.calls == 2 * 4  # one blurb + one schema per distinct ingredient
+    assert batch["labels"][2] == {"error": "No ingredient list found."}
+    second = batch["labels"][1]
+    assert second["ingredients"] == ["Salt", "Sugar", "Yeast Extract"]
+    assert second["schemas"]["Sugar"] == batch["labels"][0]["schemas"]["Sugar"]
+
+    engine.analyze_labels(texts)
+    assert summarizer.calls == 2 * 4
+
+
+def test_scan_store_queries_and_persists(tmp_path):
+    from ingredx.scan_store import ScanStore
+
+    path = str(tmp_path / "scans.npz")
+    store = ScanStore(path=path)
+    store.add(["sugar", "salt", "titanium dioxide"], [0.5, 0.8, 0.2], product="candy")
+    store.add(["water", "salt"], [1.0, None], product="brine")
+    store.add(["sugar", "water"], product="syrup")
+
+    assert store.products_with(["salt"])["products"] == ["candy", "brine"]
+    assert store.products_with(["sugar"], exclude=["titanium dioxide"])["products"] == ["syrup"]
+    score = store.score("candy", threshold=0.4)
+    assert (score["min"], score["below_threshold"]) == (0.2, 1)
+    assert score["weighted_mean"] == round((0.5 + 0.8 / 2 + 0.2 / 3) / (1 + 1 / 2 + 1 / 3), 3)
+    assert [row["product"] for row in store.rank(by="min")] == ["candy", "syrup", "brine"]
+
+    # a re-scan replaces the product's earlier label; scans are journaled, not saved
+    store.add(["water"], [1.0], product="candy")
+    assert not (tmp_path / "scans.npz").exists()
+    reloaded = ScanStore(path=path)
+    assert reloaded.products_with(["titanium dioxide"])["total"] == 0
+    assert reloaded.score("candy")["ingredient_names"] == ["water"]
+    assert reloaded.products_with(["water"])["products"] == ["brine", "syrup", "candy"]
+
+    # workers see each other's scans, before and after a fold into the snapshot
+    reloaded.add(["vinegar"], [0.9], product="pickles")
+    store.add(["salt"], [0.8], product="crisps")
+    assert store.products_with(["vinegar"])["products"] == ["pickles"]
+    reloaded.save()
+    store.add(["vinegar", "salt"], product="relish")
+    assert ScanStore(path=path).products_with(["salt"])["products"] == ["brine", "crisps", "relish"]
+    assert reloaded.products_with(["vinegar"])["products"] == ["pickles", "relish"]
+
+    # a rating change rescores the labels containing it, same as scoring from scratch
+    store.rank(by="below_threshold", threshold=0.4)
+    store.add(["salt", "sugar"], [0.3, None], product="fudge")
+    fresh = ScanStore(path=path)
+    for product in ("brine", "crisps", "relish", "fudge", "syrup"):
+        assert store.score(product, threshold=0.4) == fresh.score(product, threshold=0.4)
+    for threshold in range(10):
+        store.rank(by="below_threshold", threshold=threshold / 10)
+    assert len(store._below) == 4
+
+    # past fold_every journal lines a background thread writes the next snapshot
+    import os
+    import time
+    snapshot = os.stat(path).st_mtime_ns
+    folding = ScanStore(path=path, fold_every=3)
+    folding.add(["salt"], product="pretzels")
+    while folding._folding:
+        time.sleep(0.01)
+    assert os.stat(path).st_mtime_ns != snapshot
+    assert ScanStore(path=path).products_with(["salt"])["total"] == 5
+
+
+def test_chat_reuses_answers_for_paraphrases(tmp_path):
+    summarizer = StubSummarizer()
+    engine = _engine(tmp_path, summarizer=summarizer)
+
+    first = engine.generate("Is aspartame safe?", mode="chat")
+    assert summarizer.calls == 2  # answer + follow-up suggestions, nothing wasted
+    assert not first.explanation.cached
+
+    again = engine.generate("is aspartame bad for you", mode="chat", conversation_id=engine.new_conversation())
+    assert again.explanation.cached and again.explanation.text == first.explanation.text
+    assert summarizer.calls == 2
+
+    sucralose = engine.new_conversation()
+    engine.generate("Is sucralose safe?", mode="chat", conversation_id=sucralose)
+    engine.generate("What about for kids?", mode="chat", conversation_id=sucralose)  # answered with the conversation
+    assert summarizer.calls == 6
+
+    # the same follow-up in another conversation is about something else
+    msg = engine.new_conversation()
+    engine.generate("Is MSG safe?", mode="chat", conversation_id=msg)
+    follow_up = engine.generate("What about for kids?", mode="chat", conversation_id=msg)
+    assert not follow_up.explanation.cached
+    # a conversation the engine no longer knows is never treated as just opened
+    forgotten = engine.generate("Is aspartame safe?", mode="chat", conversation_id="expired")
+    assert not forgotten.explanation.cached
+    assert summarizer.calls == 12
+    assert engine.answer_cache.snapshot()["hits"] == 1
+
+
+def test_chat_endpoint_reuses_answers_across_conversations(tmp_path):
+    from ingredx import bench
+
+    engine = _engine(tmp_path)
+    client = bench.load_api(engine).app.test_client()
+
+    def ask(question, conversation_id=None):
+        body = client.post("/api/chat", json={"question": question, "conversation_id": conversation_id}).get_json()
+        assert body["success"]
+        return body
+
+    first = ask("Is aspartame safe?")
+    follow_up = ask("What about for kids?", first["conversation_id"])
+    assert not first["cached"] and not follow_up["cached"]
+    assert follow_up["conversation_id"] == first["conversation_id"]
+
+    other = ask("Is aspartame bad for you?")  # a new visitor's opening question
+    assert other["cached"] and other["conversation_id"] != first["conversation_id"]
+    assert client.post("/api/chat", json={"question": "hi", "conversation_id": 5}).status_code == 400
+
+
+def test_analyze_text_rejects_malformed_batches(tmp_path):
+    from ingredx import bench
+
+    client = bench.load_api(_engine(tmp_path)).app.test_client()
+    for body in ({"texts": 5}, {"texts": "Ingredients: salt"}, {"texts": []}, {"texts": ["salt"], "products": ["a", "b"]}):
+        resp = client.post("/api/analyze-text", json=body)
+        assert resp.status_code == 400 and not resp.get_json()["success"]
+
+
+def test_compact_cache_round_trips_entries(tmp_path):
+    from ingredx.core.compact import CompactTable
+
+    entry = {"common_uses": "seasoning – everywhere", "health_safety_rating": 0.3, "edible": False, "_blurb": "b"}
+    table = CompactTable({"salt": entry, "empty": {}})
+    assert table["salt"] == entry and table["empty"] == {}
+    assert table.rating("salt") == 0.3 and table.rating("empty") is None
+    del table["empty"]
+    table["sugar"] = {"edible": True}
+    assert sorted(table) == ["salt", "sugar"] and table["sugar"] == {"edible": True}
+
+    # the engine works unchanged on top of a compact backend
+    cache = MemoryCache(compact=True)
+    engine = _engine(tmp_path, cache=cache)
+    first = engine.generate("Sugar", mode="schema").structured
+    assert cache.data.rating("sugar") == first.health_safety_rating
+    assert engine.generate("Sugar", mode="schema").explanation.cached
+
+
+def test_file_cache_journals_single_entry_writes(tmp_path):
+    from ingredx.core.cache import JsonFileCache
+
+    path = str(tmp_path / "cache.json")
+    worker, other = JsonFileCache(path, compact=True), JsonFileCache(path, compact_bytes=200)
+    worker.save({"salt": {"edible": True}})
+    snapshot = (tmp_path / "cache.json").read_text(encoding="utf-8")
+
+    worker.put("sugar", {"health_safety_rating": 0.5})
+    assert (tmp_path / "cache.json").read_text(encoding="utf-8") == snapshot  # appended, not rewritten
+    assert other.load()["sugar"] == {"health_safety_rating": 0.5}
+
+    for i in range(5):  # past compact_bytes the journal is folded into the snapshot
+        other.put(f"extra {i}", {"common_uses": "filler"})
+    assert "extra 0" in (tmp_path / "cache.json").read_text(encoding="utf-8")
+    assert (tmp_path / "cache.json.log").stat().st_size < 200
+    assert sorted(worker.load()) == sorted(JsonFileCache(path).load()) == ["extra 0", "extra 1", "extra 2", "extra 3", "extra 4", "salt", "sugar"]
+
+
+def test_file_cache_snapshot_is_read_entry_by_entry():
+    import io
+    from ingredx.core.cache import _SnapshotReader
+
+    data = {"salt": {"health_safety_rating": 0.123456789, "common_uses": 'brine, "curing" {x}'}, 'a"b': {}, "n": {"edible": False}}
+    for text in (json.dumps(data, indent=2), json.dumps(data, ensure_ascii=False)):
+        assert dict(_SnapshotReader(io.StringIO(text), chunk_size=3)) == data  # values straddle chunks
+    assert dict(_SnapshotReader(io.StringIO(" {} "))) == {}
+    for broken in ("", "[1]", '{"a": 1', '{"a": 1,}'):
+        try:
+            dict(_SnapshotReader(io.StringIO(broken), chunk_size=2))
+            raise AssertionError(f"accepted {broken!r}")
+        except ValueError:
+            pass
+
+
+def test_open_circuit_serves_cache_and_kb_without_calling_the_llm(tmp_path):
+    from ingredx.core.breaker import CircuitBreaker
+    from ingredx.engine import CHAT_UNAVAILABLE
+
+    flaky = CircuitBreaker("flaky")  # judged on a full window, not on a few unlucky first calls
+    for ok in [False, False, False, True, True]:
+        flaky.record(ok, 0.1)
+    assert not flaky.is_open
+    for ok in [False] * 7 + [True] * 8:
+        flaky.record(ok, 0.1)
+    assert flaky.is_open  # 10 of 20 failed
+
+    cache = MemoryCache()
+    _engine(tmp_path, cache=cache).compare_ingredients(["Sugar", "Vinegar"])
+
+    summarizer = StubSummarizer(failure_rate=1.0)
+    breaker = CircuitBreaker("summarizer", min_calls=2, cooldown_s=60)
+    engine = _engine(tmp_path, cache=cache, summarizer=summarizer, llm_breaker=breaker)
+    engine.compare_ingredients(["Salt", "Aspartame", "Xanthan gum"])  # failures trip the circuit
+    assert engine.degraded and breaker.snapshot()["trips"] == 1
+    calls = summarizer.calls
+
+    result = engine.compare_ingredients(["Sugar", "Salt", "Aspartame"])
+    assert summarizer.calls == calls  # fails fast, no backend calls
+    sugar, salt, aspartame = result["ingredients"]
+    assert result["degraded"] and not sugar["degraded"] and sugar["source"] == "cache"
+    assert salt["degraded"] and "flavor" in salt["blurb"]
+    assert aspartame["degraded"] and "temporarily unavailable" in aspartame["blurb"]
+
+    chat = engine.generate("Is aspartame safe?", mode="chat")
+    assert chat.explanation.degraded and chat.explanation.text == CHAT_UNAVAILABLE
+    assert engine.chat_history == [] and summarizer.calls == calls
+
+
+def test_translator_errors_degrade_instead_of_failing_the_label(tmp_path):
+    class DownTranslator(IdentityTranslator):
+        def translate_many(self, texts, target_language):
+            raise ConnectionError("translator unreachable")
+
+    engine = _engine(tmp_path, translator=DownTranslator())
+    result = engine.analyze_ingredient_list("Ingredients: sugar, salt.", language="es")
+    assert result["degraded"] and result["ingredients"] == ["Sugar", "Salt"]
+    assert engine.translation_breaker.snapshot()["recent_failures"] == 1
+
+
+def test_deadline_returns_early_and_late_results_still_fill_the_cache(tmp_path):
+    import time
+    from ingredx.core.deadline import Deadline, DeadlineExceeded, RequestCancelled, use_deadline
+
+    summarizer = StubSummarizer(latency=0.3)  # honors call_timeout like OpenAISummarizer
+    engine = _engine(tmp_path, summarizer=summarizer)
+    started = time.perf_counter()
+    try:
+        with use_deadline(Deadline(0.1)):
+            engine.compare_ingredients(["Sugar", "Aspartame"])
+        raise AssertionError("deadline was not enforced")
+    except DeadlineExceeded:
+        pass
+    assert time.perf_counter() - started < 0.25  # did not wait for the in-flight calls
+
+    time.sleep(0.4)
+    assert engine._cache_entry(engine.canonical_name("Sugar")).get("_blurb")  # finished late, still cached
+    assert summarizer.calls == 2  # the schema stage was never started
+    assert not engine.degraded
+
+    started = time.perf_counter()
+    try:
+        with use_deadline(Deadline(0.1)):
+            engine.generate("Salt", mode="blurb")  # a call the request waits on is cut off at the deadline
+        raise AssertionError("deadline was not enforced")
+    except DeadlineExceeded:
+        pass
+    assert time.perf_counter() - started < 0.25 and summarizer.calls == 3
+    assert not engine.degraded  # a call the deadline cut short says nothing about the backend
+
+    cancelled = Deadline()
+    cancelled.cancel()  # client disconnected
+    try:
+        with use_deadline(cancelled):
+            engine.generate("Is aspartame safe?", mode="chat")
+        raise AssertionError("cancelled request kept running")
+    except RequestCancelled:
+        pass
+    assert engine.chat_history == [] and summarizer.calls == 3